@@ -93,6 +93,8 @@ try:
             description="GLM API 基础URL",
         )
         http_timeout: float = Field(default=30.0, ge=1.0, description="HTTP 超时时间（秒）")
+        http_max_retries: int = Field(default=2, ge=0, le=10, description="429/5xx 自动重试次数")
+        tool_concurrency_limit: int = Field(default=8, ge=1, le=64, description="同一轮工具调用的最大并发数")
         storage_root: str = Field(default=".storage", description="存储根目录")
         log_dir: str = Field(default="logs", description="日志目录")
         log_redact_content: bool = Field(default=False, description="是否脱敏日志内容")
@@ -178,6 +180,13 @@ except ImportError:
             self.http_timeout = self._as_float(
                 os.getenv("HTTP_TIMEOUT", str(cfg.get("http_timeout", "30.0")))
             )
+            self.http_max_retries = self._as_int(
+                os.getenv("HTTP_MAX_RETRIES", str(cfg.get("http_max_retries", 2)))
+            )
+            self.tool_concurrency_limit = self._as_int(
+                os.getenv("TOOL_CONCURRENCY_LIMIT", str(cfg.get("tool_concurrency_limit", 8))),
+                default=8,
+            )
             self.storage_root = os.getenv("STORAGE_ROOT", cfg.get("storage_root", ".storage"))
             self.log_dir = os.getenv("LOG_DIR", cfg.get("log_dir", "logs"))
             self.log_redact_content = self._as_bool(
@@ -214,14 +223,14 @@ except ImportError:
                 return 30.0
 
         @staticmethod
-        def _as_int(value: str) -> int:
+        def _as_int(value: str, default: int = 20) -> int:
             try:
                 v = int(value)
                 if v < 1:
-                    return 20
+                    return default
                 return v
             except ValueError:
-                return 20
+                return default
 
         @staticmethod
         def _as_bool(value: str | bool) -> bool:
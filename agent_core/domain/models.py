@@ -48,6 +48,9 @@ class ChatRequest:
 
     Agent 会将上下文裁剪后生成 ChatRequest，再交给具体 ProviderClient。
     Provider 适配层负责把本结构转换成各家 API 的 JSON 请求体。
+
+    messages 按引用保存、不做拷贝：多轮循环（如 run_agent）可以在两次请求之间
+    原地追加同一个列表，但在 Provider 处理请求期间不要修改它。
     """
 
     provider: str  # 逻辑 Provider 名，如 "kimi"
@@ -60,6 +63,9 @@ class ChatRequest:
     tools: Optional[List["ToolDef"]] = None
     # 模型是否必须/禁止使用工具
     tool_choice: Literal["auto", "none", "required"] = "auto"
+    # 预先序列化好的 tools JSON（orjson 字节串）；设置后 Provider 直接拼接，
+    # 不再逐个转换 tools。多轮工具循环中工具列表不变，只需序列化一次
+    prebuilt_tools_json: Optional[bytes] = None
 
 
 @dataclass
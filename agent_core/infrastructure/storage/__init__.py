@@ -1,5 +1,6 @@
 """存储子模块入口。
 
 当前实现 JsonConversationStore 作为默认的会话存储方案，
+BinLogConversationStore 以二进制帧日志保存消息，适合大体量会话，
 并预留 SqliteConversationStore 作为未来可选实现。
 """
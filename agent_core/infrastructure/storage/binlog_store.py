@@ -0,0 +1,67 @@
+"""基于长度前缀二进制日志的会话存储。
+
+会话元数据仍沿用 JsonConversationStore 的 meta.json，
+消息改为写入 messages.bin，每条记录的帧格式为：
+
+    len: u32 (little-endian) | orjson 序列化的 MessageRecord
+
+读取时通过 mmap 映射整个文件，按帧切片直接交给 orjson 解析，
+无需像 JSONL 那样先解码整份文本再逐行拆分，适合消息量较大的会话。
+已有的 messages.jsonl 会先于 messages.bin 读出，便于从 JSON 存储平滑迁移。
+"""
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+import orjson
+
+from agent_core.domain.conversation import MessageRecord
+from agent_core.infrastructure.storage.json_store import JsonConversationStore
+
+_FRAME_HEADER = struct.Struct("<I")
+_MESSAGES_FILE = "messages.bin"
+
+
+class BinLogConversationStore(JsonConversationStore):
+    """消息以二进制帧追加写入的 ConversationStore 实现。"""
+
+    def _append_message(self, cdir: Path, message: MessageRecord) -> None:
+        body = self._dumps(message)
+        with (cdir / _MESSAGES_FILE).open("ab") as f:
+            f.write(_FRAME_HEADER.pack(len(body)) + body)
+
+    def _iter_message_payloads(self, cdir: Path) -> Iterator[Dict[str, Any]]:
+        # 迁移前写入的 JSONL 消息排在前面
+        yield from super()._iter_message_payloads(cdir)
+        bin_path = cdir / _MESSAGES_FILE
+        if not bin_path.exists():
+            return
+        with bin_path.open("rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # 空文件无法 mmap
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    pos = 0
+                    while pos + _FRAME_HEADER.size <= size:
+                        (length,) = _FRAME_HEADER.unpack_from(mm, pos)
+                        pos += _FRAME_HEADER.size
+                        end = pos + length
+                        if end > size:
+                            # 写入中断留下的残缺尾帧
+                            break
+                        with view[pos:end] as frame:
+                            try:
+                                data = orjson.loads(frame)
+                            except orjson.JSONDecodeError:
+                                data = None
+                        pos = end
+                        if data is not None:
+                            yield data
+                finally:
+                    view.release()
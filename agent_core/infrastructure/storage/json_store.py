@@ -1,16 +1,29 @@
 import json
 import os
 import shutil
-from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 from uuid import uuid4
 
+import orjson
+
 from agent_core.config.settings import settings
 from agent_core.domain.conversation import ConversationStore, Conversation, MessageRecord
 from agent_core.domain.exceptions import BusinessError
 
+_UTC = timezone.utc
+# datetime 直接交给 orjson 序列化，UTC 时间输出为 "...Z"；naive 时间按 UTC 处理
+_DUMPS_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+
+
+def _as_utc(value: datetime) -> datetime:
+    """归一化为 UTC；已是 UTC 的时间直接返回，避免多余的 astimezone。"""
+
+    if value.tzinfo is _UTC:
+        return value
+    return value.astimezone(_UTC)
+
 
 class JsonConversationStore(ConversationStore):
     def __init__(self, root: str | Path | None = None):
@@ -22,7 +35,7 @@ class JsonConversationStore(ConversationStore):
         cid = f"c-{uuid4().hex}"
         cdir = self._conv_root / cid
         cdir.mkdir(parents=True, exist_ok=True)
-        now = datetime.now(timezone.utc)
+        now = datetime.now(_UTC)
         meta_copy = dict(meta)
         title = meta_copy.pop("title", meta_copy.get("projectRoot", ""))
         conv = Conversation(id=cid, title=title, agent_type=agent_type, created_at=now, updated_at=now, meta=meta_copy)
@@ -68,15 +81,10 @@ class JsonConversationStore(ConversationStore):
 
     def add_message(self, message: MessageRecord) -> None:
         cdir = self._conv_root / message.conversation_id
-        msgs_path = cdir / "messages.jsonl"
         try:
-            payload = asdict(message)
-            payload["created_at"] = message.created_at.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-            line = json.dumps(payload, ensure_ascii=False)
-            with msgs_path.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            self._append_message(cdir, message)
             conv = self.get_conversation(message.conversation_id)
-            conv.updated_at = datetime.now(timezone.utc)
+            conv.updated_at = datetime.now(_UTC)
             meta_provider = message.meta.get("provider")
             meta_model = message.meta.get("model")
             if meta_provider:
@@ -91,27 +99,16 @@ class JsonConversationStore(ConversationStore):
 
     def get_message(self, message_id: str) -> MessageRecord:
         for cdir in self._conv_root.glob("*/"):
-            msgs_path = cdir / "messages.jsonl"
-            if not msgs_path.exists():
-                continue
-            for line in msgs_path.read_text(encoding="utf-8").splitlines():
-                try:
-                    data = json.loads(line)
-                except Exception:
-                    continue
+            for data in self._iter_message_payloads(cdir):
                 if data.get("id") == message_id:
                     return self._to_message(data)
         raise BusinessError(code="MESSAGE_NOT_FOUND", message=message_id)
 
     def list_messages(self, conversation_id: str) -> List[MessageRecord]:
         cdir = self._conv_root / conversation_id
-        msgs_path = cdir / "messages.jsonl"
         items: List[MessageRecord] = []
-        if not msgs_path.exists():
-            return items
-        for line in msgs_path.read_text(encoding="utf-8").splitlines():
+        for data in self._iter_message_payloads(cdir):
             try:
-                data = json.loads(line)
                 items.append(self._to_message(data))
             except Exception:
                 continue
@@ -131,7 +128,7 @@ class JsonConversationStore(ConversationStore):
         """更新会话标题。"""
         conv = self.get_conversation(conversation_id)
         conv.title = title
-        conv.updated_at = datetime.now(timezone.utc)
+        conv.updated_at = datetime.now(_UTC)
         cdir = self._conv_root / conversation_id
         self._write_meta(cdir, conv)
 
@@ -142,16 +139,43 @@ class JsonConversationStore(ConversationStore):
             "id": conv.id,
             "title": conv.title,
             "agent_type": conv.agent_type,
-            "created_at": conv.created_at.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
-            "updated_at": conv.updated_at.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "created_at": _as_utc(conv.created_at),
+            "updated_at": _as_utc(conv.updated_at),
             "meta": conv.meta,
         }
         try:
-            tmp_path.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+            tmp_path.write_bytes(self._dumps(obj))
             os.replace(tmp_path, meta_path)
         except Exception as e:
             raise BusinessError(code="STORE_WRITE_ERROR", message=str(e))
 
+    @staticmethod
+    def _dumps(obj: Any, option: int = 0) -> bytes:
+        """按存储统一的 orjson 选项序列化，子类写自己的消息格式时复用。"""
+
+        return orjson.dumps(obj, option=_DUMPS_OPTIONS | option)
+
+    def _append_message(self, cdir: Path, message: MessageRecord) -> None:
+        """把一条消息追加到会话的 messages.jsonl。"""
+
+        # orjson 原生序列化 dataclass，无需 asdict 深拷贝；
+        # 非 UTC 时间会带上时区偏移写入，读取时 fromisoformat 可正确还原
+        line = self._dumps(message, orjson.OPT_APPEND_NEWLINE)
+        with (cdir / "messages.jsonl").open("ab") as f:
+            f.write(line)
+
+    def _iter_message_payloads(self, cdir: Path) -> Iterator[Dict[str, Any]]:
+        """逐条产出 messages.jsonl 中的原始消息 dict，跳过损坏的行。"""
+
+        msgs_path = cdir / "messages.jsonl"
+        if not msgs_path.exists():
+            return
+        for line in msgs_path.read_text(encoding="utf-8").splitlines():
+            try:
+                yield json.loads(line)
+            except Exception:
+                continue
+
     def _to_message(self, data: Dict[str, Any]) -> MessageRecord:
         return MessageRecord(
             id=data["id"],
@@ -4,22 +4,28 @@
 - 定义 Provider 抽象接口 (base)。
 - 维护 Provider 与模型配置 (registry)。
 - 提供各厂商的具体实现 (如 kimi_client、glm_client)。
+- 各厂商共用的请求体构造 (request_body) 与 SSE 流解析 (sse)。
 """
 
 from typing import Literal, Optional
 
 from agent_core.config.settings import settings
 from agent_core.providers.base import ProviderClient
-from agent_core.providers.kimi_client import KimiClient
-from agent_core.providers.glm_client import GlmClient
 
 
 def create_provider(name: Optional[str] = None) -> ProviderClient:
-    """根据名称创建 Provider 实例，默认取配置中的 provider。"""
+    """根据名称创建 Provider 实例，默认取配置中的 provider。
+
+    具体 Client 在此处按需导入，避免只用一个 Provider 时也加载 httpx 等全部依赖。
+    """
 
     provider_name = (name or getattr(settings, "default_provider", "glm")).lower()
     if provider_name == "kimi":
+        from agent_core.providers.kimi_client import KimiClient
+
         return KimiClient(settings)
+    from agent_core.providers.glm_client import GlmClient
+
     return GlmClient(settings)
 
 
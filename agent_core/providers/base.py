@@ -8,7 +8,7 @@
 这样可以在不改 Agent 代码的前提下接入更多厂商（OpenAI、DeepSeek 等）。
 """
 
-from typing import Protocol, Iterable
+from typing import AsyncIterator, Protocol, Iterable
 from agent_core.domain.models import ChatRequest, ChatResult, ChatStreamChunk
 
 
@@ -29,3 +29,19 @@ class ProviderClient(Protocol):
         """执行一次流式对话调用，逐步产出增量。"""
 
         ...
+
+
+class AsyncProviderClient(ProviderClient, Protocol):
+    """额外提供异步调用的 Provider 客户端协议。
+
+    适用于多文件审查等需要并发发起多次 LLM 调用的场景，
+    调用方可用 asyncio.gather 配合信号量控制并发度。
+    """
+
+    async def achat(self, req: ChatRequest) -> ChatResult:
+        ...
+
+    def achat_stream(self, req: ChatRequest) -> AsyncIterator[ChatStreamChunk]:
+        """异步流式对话调用，返回异步迭代器。"""
+
+        ...
@@ -24,7 +24,9 @@ from agent_core.domain.models import (
     ChatUsage,
 )
 from agent_core.providers.registry import GLM_CONFIG, ModelConfig
-from agent_core.tools.definitions import ToolCall, ToolDef
+from agent_core.providers.request_body import body_kwargs
+from agent_core.providers.sse import decode_sse_line, iter_sse_lines
+from agent_core.tools.definitions import ToolCall, ToolDef, make_tool_call
 
 
 class GlmClient:
@@ -41,13 +43,13 @@ class GlmClient:
         if not getattr(self._settings, "glm_api_key", None):
             raise ValidationError(code="MISSING_API_KEY", message="GLM_API_KEY not set")
         model_cfg = GLM_CONFIG.models[req.model]
-        payload = self._build_payload(req, model_cfg, stream=False)
+        body = body_kwargs(self._build_payload(req, model_cfg, stream=False), req.prebuilt_tools_json)
         try:
             with httpx.Client(timeout=self._settings.http_timeout, trust_env=False) as client:
                 base = getattr(self._settings, "glm_base_url", None) or GLM_CONFIG.base_url
                 resp = client.post(
                     f"{base}/chat/completions",
-                    json=payload,
+                    **body,
                     headers={
                         "Authorization": f"Bearer {self._settings.glm_api_key}",
                         "Content-Type": "application/json",
@@ -68,14 +70,14 @@ class GlmClient:
         if not getattr(self._settings, "glm_api_key", None):
             raise ValidationError(code="MISSING_API_KEY", message="GLM_API_KEY not set")
         model_cfg = GLM_CONFIG.models[req.model]
-        payload = self._build_payload(req, model_cfg, stream=True)
+        body = body_kwargs(self._build_payload(req, model_cfg, stream=True), req.prebuilt_tools_json)
         try:
             with httpx.Client(timeout=self._settings.http_timeout, trust_env=False) as client:
                 base = getattr(self._settings, "glm_base_url", None) or GLM_CONFIG.base_url
                 with client.stream(
                     "POST",
                     f"{base}/chat/completions",
-                    json=payload,
+                    **body,
                     headers={
                         "Authorization": f"Bearer {self._settings.glm_api_key}",
                         "Content-Type": "application/json",
@@ -85,19 +87,9 @@ class GlmClient:
                         raise RateLimitError(code="RATE_LIMIT", message="GLM rate limit")
                     if resp.status_code >= 400:
                         raise ApiError(code="API_ERROR", message=resp.text, http_status=resp.status_code)
-                    for line in resp.iter_lines():
-                        if not line:
-                            continue
-                        data_str = line
-                        if data_str.startswith("data:"):
-                            data_str = data_str[5:].strip()
-                        else:
-                            data_str = data_str.strip()
-                        if not data_str or data_str == "[DONE]":
-                            continue
-                        try:
-                            payload_chunk = json.loads(data_str)
-                        except json.JSONDecodeError:
+                    for line in iter_sse_lines(resp.iter_bytes()):
+                        payload_chunk = decode_sse_line(line)
+                        if payload_chunk is None:
                             continue
                         yield self._parse_stream_chunk(payload_chunk, req)
         except httpx.RequestError as e:
@@ -115,7 +107,10 @@ class GlmClient:
             "top_p": req.top_p,
             "stream": stream,
         }
-        if req.tools:
+        if req.prebuilt_tools_json is not None:
+            # tools 已预先序列化，由 body_kwargs 拼接到请求体
+            payload["tool_choice"] = req.tool_choice
+        elif req.tools:
             payload["tools"] = [self._serialize_tool(tool) for tool in req.tools]
             payload["tool_choice"] = req.tool_choice
         return payload
@@ -137,27 +132,39 @@ class GlmClient:
     def _build_chat_message(self, payload: Dict[str, Any]) -> ChatMessage:
         """解析 GLM message，兼容 tool_calls/function_call。"""
 
+        if "tool_calls" not in payload and "function_call" not in payload:
+            # 常见路径：纯文本消息/流式增量，不涉及工具调用
+            return ChatMessage(
+                role=payload.get("role") or "assistant",
+                content=payload.get("content") or "",
+                tool_call_id=payload.get("tool_call_id"),
+            )
+
         role = payload.get("role") or "assistant"
         content = payload.get("content") or ""
         tool_calls_raw = payload.get("tool_calls") or []
         tool_calls: List[ToolCall] = []
         for idx, call in enumerate(tool_calls_raw):
             func = call.get("function") or {}
+            raw_arguments = func.get("arguments")
             tool_calls.append(
-                ToolCall(
-                    id=call.get("id") or f"tool_call_{idx}",
-                    name=func.get("name") or call.get("name") or "",
-                    arguments=self._parse_arguments(func.get("arguments")),
+                make_tool_call(
+                    call.get("id") or f"tool_call_{idx}",
+                    func.get("name") or call.get("name") or "",
+                    raw_arguments,
+                    self._parse_arguments(raw_arguments),
                 )
             )
 
         function_call = payload.get("function_call")
         if function_call:
+            raw_arguments = function_call.get("arguments")
             tool_calls.append(
-                ToolCall(
-                    id=function_call.get("id") or "function_call",
-                    name=function_call.get("name") or "",
-                    arguments=self._parse_arguments(function_call.get("arguments")),
+                make_tool_call(
+                    function_call.get("id") or "function_call",
+                    function_call.get("name") or "",
+                    raw_arguments,
+                    self._parse_arguments(raw_arguments),
                 )
             )
 
@@ -209,7 +216,7 @@ class GlmClient:
                         "type": "function",
                         "function": {
                             "name": call.name,
-                            "arguments": json.dumps(call.arguments, ensure_ascii=False),
+                            "arguments": call.arguments_json(),
                         },
                     }
                 )
@@ -219,35 +226,18 @@ class GlmClient:
         return payload
 
     def _serialize_tool(self, tool: ToolDef) -> Dict[str, Any]:
-        properties: Dict[str, Any] = {}
-        required: List[str] = []
-        for name, param in tool.params.items():
-            schema = param.schema or {"type": "string"}
-            if param.description:
-                schema = {**schema, "description": param.description}
-            properties[name] = schema
-            if param.required:
-                required.append(name)
-        return {
-            "type": "function",
-            "function": {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": properties,
-                    "required": required,
-                },
-            },
-        }
+        return tool.to_openai_schema()
 
     @staticmethod
     def _parse_arguments(raw: Any) -> Dict[str, Any]:
-        if isinstance(raw, dict):
-            return raw
-        if isinstance(raw, str):
+        # 线上协议里 arguments 几乎总是 JSON 字符串，优先按精确类型判断
+        if type(raw) is str:
             try:
                 return json.loads(raw)
             except json.JSONDecodeError:
                 return {"_raw": raw}
+        if raw is None:
+            return {}
+        if isinstance(raw, dict):
+            return raw
         return {}
@@ -11,9 +11,17 @@
 后续接入其他 Provider 时，可以参考此文件的结构实现对应的 Client。
 """
 
+import asyncio
+import random
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, List, Iterable, Optional
+
 import httpx
-import json
-from typing import Any, Dict, List, Iterable
+import orjson
 
 from agent_core.domain.models import (
     ChatRequest,
@@ -25,8 +33,36 @@ from agent_core.domain.models import (
     ChatStreamChoice,
 )
 from agent_core.domain.exceptions import NetworkError, ApiError, RateLimitError, ValidationError
-from agent_core.providers.registry import KIMI_CONFIG, ModelConfig
-from agent_core.tools.definitions import ToolDef, ToolCall
+from agent_core.providers.registry import KIMI_CONFIG
+from agent_core.providers.request_body import body_kwargs
+from agent_core.providers.sse import aiter_sse_lines, decode_sse_line, iter_sse_lines
+from agent_core.tools.definitions import ToolDef, ToolCall, make_tool_call
+
+# 可自动重试的状态码：限流与网关/服务暂时不可用
+_RETRY_STATUS = frozenset({429, 502, 503, 504})
+_RETRY_BASE_DELAY = 0.5
+_RETRY_MAX_DELAY = 20.0
+
+
+def _retry_delay(resp: httpx.Response, attempt: int) -> float:
+    """计算第 attempt 次重试前的等待秒数。
+
+    服务端给出 Retry-After（秒数或 HTTP 日期）时以其为准，
+    否则按指数退避并叠加随机抖动，避免并发请求同时重试。
+    """
+
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(_RETRY_MAX_DELAY, max(0.0, delay))
+    return min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2**attempt + random.uniform(0, _RETRY_BASE_DELAY))
 
 
 class KimiClient:
@@ -41,6 +77,96 @@ class KimiClient:
     def __init__(self, settings):
         # Settings 里包含 base_url、api_key、超时等配置
         self._settings = settings
+        # base_url 与完整请求地址只解析一次；认证头挂在共享 Client 上
+        self._base_url = getattr(settings, "kimi_base_url", None) or KIMI_CONFIG.base_url
+        self._chat_url = f"{self._base_url}/chat/completions"
+        # 逻辑模型 -> (厂商模型名, max_tokens, 默认温度)，构造 payload 时直接解包
+        self._models = {
+            key: (cfg.provider_model, cfg.max_tokens, cfg.default_temperature)
+            for key, cfg in KIMI_CONFIG.models.items()
+        }
+        # 复用同一个 httpx.Client（连接池 + keep-alive），首次请求时才创建
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        # 异步调用使用独立的 AsyncClient，同样懒加载并复用。AsyncClient 绑定创建它的事件循环，
+        # 而实例在进程内共享，因此按事件循环分别缓存；循环被回收后对应条目自动消失
+        self._aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # 429/5xx 时在同一连接池上透明重试的次数
+        self._max_retries = getattr(settings, "http_max_retries", 2)
+
+    def __enter__(self) -> "KimiClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """关闭底层连接池；之后再次调用 chat 会重新建立。"""
+
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的异步连接池；在 asyncio.run 结束前调用以释放连接。"""
+
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            aclient = self._aclients.pop(loop, None)
+        if aclient is not None:
+            await aclient.aclose()
+
+    def _client_options(self, max_keepalive: int) -> Dict[str, Any]:
+        return {
+            "timeout": self._settings.http_timeout,
+            "trust_env": False,
+            "limits": httpx.Limits(max_keepalive_connections=max_keepalive, max_connections=32),
+            "headers": {
+                "Authorization": f"Bearer {self._settings.kimi_api_key}",
+                "Content-Type": "application/json",
+            },
+        }
+
+    def _get_client(self) -> httpx.Client:
+        client = self._client
+        if client is None:
+            with self._client_lock:
+                client = self._client
+                if client is None:
+                    client = httpx.Client(**self._client_options(max_keepalive=16))
+                    self._client = client
+        return client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # 不同线程上的事件循环可能同时取用，字典读写需要加锁
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            aclient = self._aclients.get(loop)
+            if aclient is None:
+                aclient = httpx.AsyncClient(**self._client_options(max_keepalive=32))
+                self._aclients[loop] = aclient
+        return aclient
+
+    @staticmethod
+    def _check_status(resp: httpx.Response) -> None:
+        """把限流/HTTP 错误状态码转换为业务异常。"""
+
+        if resp.status_code == 429:
+            # 限流错误交给上层做重试/退避
+            raise RateLimitError(code="RATE_LIMIT", message="Kimi rate limit")
+        if resp.status_code >= 400:
+            # 其他 HTTP 错误统一包装为 ApiError
+            raise ApiError(code="API_ERROR", message=resp.text, http_status=resp.status_code)
+
+    def _should_retry(self, resp: httpx.Response, attempt: int) -> Optional[float]:
+        """需要重试时返回等待秒数，否则返回 None（同步/异步路径共用）。"""
+
+        if resp.status_code in _RETRY_STATUS and attempt < self._max_retries:
+            return _retry_delay(resp, attempt)
+        return None
 
     def chat(self, req: ChatRequest) -> ChatResult:
         """执行一次非流式对话调用。
@@ -55,87 +181,165 @@ class KimiClient:
         if not getattr(self._settings, "kimi_api_key", None):
             # 配置缺失走 ValidationError，方便上层统一处理
             raise ValidationError(code="MISSING_API_KEY", message="KIMI_API_KEY not set")
-        model_cfg = KIMI_CONFIG.models[req.model]
-        payload = self._build_payload(req, model_cfg)
+        body = body_kwargs(self._build_payload(req), req.prebuilt_tools_json)
+        client = self._get_client()
+        attempt = 0
+        while True:
+            try:
+                resp = client.post(self._chat_url, **body)
+            except httpx.RequestError as e:
+                # 网络错误：DNS 失败、连接超时等
+                raise NetworkError(code="NETWORK_ERROR", message=str(e))
+            delay = self._should_retry(resp, attempt)
+            if delay is None:
+                break
+            time.sleep(delay)
+            attempt += 1
+        self._check_status(resp)
+        data = orjson.loads(resp.content)
+        return self._parse_response(data, req)
+
+    def chat_stream(self, req: ChatRequest) -> Iterable[ChatStreamChunk]:
+        """执行一次流式对话调用，逐步 yield ChatStreamChunk。"""
+
+        if not getattr(self._settings, "kimi_api_key", None):
+            raise ValidationError(code="MISSING_API_KEY", message="KIMI_API_KEY not set")
+        payload = self._build_payload(req)
+        payload["stream"] = True
+        body = body_kwargs(payload, req.prebuilt_tools_json)
+        client = self._get_client()
+        attempt = 0
         try:
-            with httpx.Client(timeout=self._settings.http_timeout, trust_env=False) as client:
-                base = getattr(self._settings, "kimi_base_url", None) or KIMI_CONFIG.base_url
-                resp = client.post(
-                    f"{base}/chat/completions",
-                    json=payload,
-                    headers={
-                        "Authorization": f"Bearer {self._settings.kimi_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                )
+            while True:
+                with client.stream("POST", self._chat_url, **body) as resp:
+                    # 重试只发生在读取正文之前，调用方不会收到重复的增量
+                    delay = self._should_retry(resp, attempt)
+                    if delay is None:
+                        if resp.status_code >= 400:
+                            # 流式响应需先读完正文，ApiError 才能带上错误详情
+                            resp.read()
+                        self._check_status(resp)
+                        # 按网络实际到达的分块读取（指定 chunk_size 会让 httpx 攒满才交付），
+                        # 由 SseLineBuffer 在预分配缓冲区内切行
+                        for line in iter_sse_lines(resp.iter_bytes()):
+                            payload_chunk = decode_sse_line(line)
+                            if payload_chunk is None:
+                                continue
+                            chunk = self._parse_stream_chunk(payload_chunk, req)
+                            yield chunk
+                        return
+                time.sleep(delay)
+                attempt += 1
         except httpx.RequestError as e:
-            # 网络错误：DNS 失败、连接超时等
             raise NetworkError(code="NETWORK_ERROR", message=str(e))
-        if resp.status_code == 429:
-            # 限流错误交给上层做重试/退避
-            raise RateLimitError(code="RATE_LIMIT", message="Kimi rate limit")
-        if resp.status_code >= 400:
-            # 其他 HTTP 错误统一包装为 ApiError
-            raise ApiError(code="API_ERROR", message=resp.text, http_status=resp.status_code)
-        data = resp.json()
+
+    async def achat(self, req: ChatRequest) -> ChatResult:
+        """chat 的异步版本，便于用 asyncio.gather 并发发起多次调用。"""
+
+        if not getattr(self._settings, "kimi_api_key", None):
+            raise ValidationError(code="MISSING_API_KEY", message="KIMI_API_KEY not set")
+        body = body_kwargs(self._build_payload(req), req.prebuilt_tools_json)
+        client = self._get_async_client()
+        attempt = 0
+        while True:
+            try:
+                resp = await client.post(self._chat_url, **body)
+            except httpx.RequestError as e:
+                raise NetworkError(code="NETWORK_ERROR", message=str(e))
+            delay = self._should_retry(resp, attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        self._check_status(resp)
+        data = orjson.loads(resp.content)
         return self._parse_response(data, req)
 
-    def chat_stream(self, req: ChatRequest) -> Iterable[ChatStreamChunk]:
-        """执行一次流式对话调用，逐步 yield ChatStreamChunk。"""
+    async def achat_batch(self, reqs: List[ChatRequest], max_concurrency: int = 8) -> List[ChatResult]:
+        """并发执行多个相互独立的请求，结果顺序与 reqs 一致。
+
+        max_concurrency 限制同时在途的请求数，避免瞬间打满 RPM 配额。
+        """
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(req: ChatRequest) -> ChatResult:
+            async with semaphore:
+                return await self.achat(req)
+
+        return list(await asyncio.gather(*(run(req) for req in reqs)))
+
+    def chat_batch(self, reqs: List[ChatRequest], max_concurrency: int = 8) -> List[ChatResult]:
+        """achat_batch 的同步入口，供非异步调用方批量审查多个文件/问题。
+
+        在独立的事件循环中执行，结束前关闭该循环上的连接池；
+        已处于事件循环中的调用方应直接 await achat_batch。
+        """
+
+        async def run() -> List[ChatResult]:
+            # 连接池按事件循环缓存，每次 asyncio.run 都是新循环，并发的批量调用之间互不影响
+            try:
+                return await self.achat_batch(reqs, max_concurrency)
+            finally:
+                await self.aclose()
+
+        return asyncio.run(run())
+
+    async def achat_stream(self, req: ChatRequest) -> AsyncIterator[ChatStreamChunk]:
+        """chat_stream 的异步版本，逐步 yield ChatStreamChunk。"""
 
         if not getattr(self._settings, "kimi_api_key", None):
             raise ValidationError(code="MISSING_API_KEY", message="KIMI_API_KEY not set")
-        model_cfg = KIMI_CONFIG.models[req.model]
-        payload = self._build_payload(req, model_cfg)
+        payload = self._build_payload(req)
         payload["stream"] = True
+        body = body_kwargs(payload, req.prebuilt_tools_json)
+        client = self._get_async_client()
+        attempt = 0
         try:
-            with httpx.Client(timeout=self._settings.http_timeout, trust_env=False) as client:
-                base = getattr(self._settings, "kimi_base_url", None) or KIMI_CONFIG.base_url
-                with client.stream(
-                    "POST",
-                    f"{base}/chat/completions",
-                    json=payload,
-                    headers={
-                        "Authorization": f"Bearer {self._settings.kimi_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                ) as resp:
-                    if resp.status_code == 429:
-                        raise RateLimitError(code="RATE_LIMIT", message="Kimi rate limit")
-                    if resp.status_code >= 400:
-                        raise ApiError(code="API_ERROR", message=resp.text, http_status=resp.status_code)
-                    for line in resp.iter_lines():
-                        if not line:
-                            continue
-                        data_str = line
-                        if data_str.startswith("data:"):
-                            data_str = data_str[5:].strip()
-                        else:
-                            data_str = data_str.strip()
-                        if not data_str or data_str == "[DONE]":
-                            continue
-                        try:
-                            payload_chunk = json.loads(data_str)
-                        except json.JSONDecodeError:
-                            continue
-                        chunk = self._parse_stream_chunk(payload_chunk, req)
-                        yield chunk
+            while True:
+                async with client.stream("POST", self._chat_url, **body) as resp:
+                    delay = self._should_retry(resp, attempt)
+                    if delay is None:
+                        if resp.status_code >= 400:
+                            await resp.aread()
+                        self._check_status(resp)
+                        async for line in aiter_sse_lines(resp.aiter_bytes()):
+                            payload_chunk = decode_sse_line(line)
+                            if payload_chunk is None:
+                                continue
+                            yield self._parse_stream_chunk(payload_chunk, req)
+                        return
+                await asyncio.sleep(delay)
+                attempt += 1
         except httpx.RequestError as e:
             raise NetworkError(code="NETWORK_ERROR", message=str(e))
 
-    def _build_payload(self, req: ChatRequest, model_cfg: ModelConfig) -> dict:
+    def _build_payload(self, req: ChatRequest) -> dict:
         """将 ChatRequest 转成 Kimi 所需的请求 JSON。"""
 
-        msgs = [self._message_to_payload(m) for m in req.messages]
+        provider_model, max_tokens, default_temperature = self._models[req.model]
+        msgs: List[Dict[str, Any]] = []
+        append = msgs.append
+        for m in req.messages:
+            if m.tool_calls or m.tool_call_id:
+                append(self._message_to_payload(m))
+            elif m.content:
+                # 常见路径：纯文本的 user/assistant/system 消息
+                append({"role": m.role, "content": m.content})
+            else:
+                append({"role": m.role})
         payload = {
-            "model": model_cfg.provider_model,
+            "model": provider_model,
             "messages": msgs,
-            "temperature": req.temperature or model_cfg.default_temperature,
-            "max_tokens": req.max_tokens or model_cfg.max_tokens,
+            "temperature": req.temperature or default_temperature,
+            "max_tokens": req.max_tokens or max_tokens,
             "top_p": req.top_p,
         }
-        # 工具调用：如果请求中携带了工具定义，则按 Moonshot 规范转换
-        if req.tools:
+        # 工具调用：如果请求中携带了工具定义，则按 Moonshot 规范转换；
+        # 已有预序列化结果时 tools 由 body_kwargs 拼接，这里只写 tool_choice
+        if req.prebuilt_tools_json is not None:
+            payload["tool_choice"] = req.tool_choice
+        elif req.tools:
             payload["tools"] = [self._serialize_tool(tool) for tool in req.tools]
             payload["tool_choice"] = req.tool_choice
         return payload
@@ -159,29 +363,7 @@ class KimiClient:
     def _serialize_tool(self, tool: ToolDef) -> Dict[str, Any]:
         """把内部的 ToolDef 转成 Moonshot/Kimi 的 function tool 描述。"""
 
-        properties: Dict[str, Any] = {}
-        required: List[str] = []
-        for name, param in tool.params.items():
-            properties[name] = param.schema or {"type": "string"}
-            if param.description:
-                properties[name] = {
-                    **properties[name],
-                    "description": param.description,
-                }
-            if param.required:
-                required.append(name)
-        return {
-            "type": "function",
-            "function": {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": properties,
-                    "required": required,
-                },
-            },
-        }
+        return tool.to_openai_schema()
 
     def _build_chat_message(self, payload: Dict[str, Any]) -> ChatMessage:
         """将单条厂商 message 转换为 ChatMessage。
@@ -190,28 +372,38 @@ class KimiClient:
         方便 AgentEngine 后续执行工具循环。
         """
 
+        if "tool_calls" not in payload and "function_call" not in payload:
+            # 常见路径：纯文本消息/流式增量，不涉及工具调用
+            return ChatMessage(
+                role=payload.get("role") or "assistant",
+                content=payload.get("content") or "",
+                tool_call_id=payload.get("tool_call_id"),
+            )
+
         tool_calls_raw = payload.get("tool_calls") or []
         tool_calls: List[ToolCall] = []
         for idx, call in enumerate(tool_calls_raw):
             func = call.get("function") or {}
-            name = func.get("name") or call.get("name") or ""
-            arguments = self._parse_arguments(func.get("arguments"))
+            raw_arguments = func.get("arguments")
             tool_calls.append(
-                ToolCall(
-                    id=call.get("id") or f"tool_call_{idx}",
-                    name=name,
-                    arguments=arguments,
+                make_tool_call(
+                    call.get("id") or f"tool_call_{idx}",
+                    func.get("name") or call.get("name") or "",
+                    raw_arguments,
+                    self._parse_arguments(raw_arguments),
                 )
             )
 
         # Moonshot 在部分模型上仍会返回旧版 function_call 字段
         function_call = payload.get("function_call")
         if function_call:
+            raw_arguments = function_call.get("arguments")
             tool_calls.append(
-                ToolCall(
-                    id=function_call.get("id") or "function_call",
-                    name=function_call.get("name") or "",
-                    arguments=self._parse_arguments(function_call.get("arguments")),
+                make_tool_call(
+                    function_call.get("id") or "function_call",
+                    function_call.get("name") or "",
+                    raw_arguments,
+                    self._parse_arguments(raw_arguments),
                 )
             )
         return ChatMessage(
@@ -226,16 +418,19 @@ class KimiClient:
         """解析工具调用的 arguments 字段。
 
         Moonshot/Kimi 会把 arguments 作为 JSON 字符串返回，这里做一层
-        json.loads 尝试，失败时保留原始字符串到 `_raw`，避免信息丢失。
+        orjson.loads 尝试，失败时保留原始字符串到 `_raw`，避免信息丢失。
         """
 
-        if isinstance(raw, dict):
-            return raw
-        if isinstance(raw, str):
+        # 线上协议里 arguments 几乎总是 JSON 字符串，优先按精确类型判断
+        if type(raw) is str:
             try:
-                return json.loads(raw)
-            except json.JSONDecodeError:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
                 return {"_raw": raw}
+        if raw is None:
+            return {}
+        if isinstance(raw, dict):
+            return raw
         return {}
 
     def _parse_stream_chunk(self, data: dict, req: ChatRequest) -> ChatStreamChunk:
@@ -281,7 +476,7 @@ class KimiClient:
                         "type": "function",
                         "function": {
                             "name": call.name,
-                            "arguments": json.dumps(call.arguments, ensure_ascii=False),
+                            "arguments": call.arguments_json(),
                         },
                     }
                 )
@@ -0,0 +1,15 @@
+"""OpenAI 兼容 chat/completions 请求体的构造工具，供各 Provider 共用。"""
+
+from typing import Any, Dict, Optional
+
+import orjson
+
+
+def body_kwargs(payload: Dict[str, Any], prebuilt_tools_json: Optional[bytes]) -> Dict[str, Any]:
+    """生成 httpx 请求体参数；有预序列化的 tools 时直接拼到 orjson 输出末尾。"""
+
+    if prebuilt_tools_json is None:
+        return {"json": payload}
+    body = orjson.dumps(payload)
+    # payload 是非空 dict，orjson 输出必以 "}" 结尾
+    return {"content": b"".join((body[:-1], b',"tools":', prebuilt_tools_json, b"}"))}
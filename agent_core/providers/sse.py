@@ -0,0 +1,122 @@
+"""SSE（Server-Sent Events）字节流的行切分工具。
+
+流式 chat/completions 接口按 SSE 协议逐行返回 `data: {...}`。
+SseLineBuffer 在一块预分配的 bytearray 上拼接网络分块并按换行切分：
+只有单行超过当前容量时才翻倍扩容一次，之后整个流复用同一块内存，
+不会随着分块到达反复 realloc。
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Optional
+
+import orjson
+
+DEFAULT_CAPACITY = 65536
+
+
+class SseLineBuffer:
+    """把任意切分的字节块还原为完整的 SSE 行。
+
+    feed/flush 产出的 memoryview 直接引用内部缓冲区（不含行尾的 \\r\\n），
+    只在下一次调用 feed 之前有效，调用方需要在此之前完成解析。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        # [_start, _end) 为尚未切出完整行的数据
+        self._start = 0
+        self._end = 0
+
+    def feed(self, chunk: bytes) -> Iterator[memoryview]:
+        """写入一个网络分块，产出其中所有已完整的行。"""
+
+        size = len(chunk)
+        if self._end + size > len(self._buf):
+            self._reserve(size)
+        self._view[self._end:self._end + size] = chunk
+        scan = self._end
+        self._end += size
+        while True:
+            nl = self._buf.find(b"\n", scan, self._end)
+            if nl < 0:
+                break
+            line_end = nl
+            if line_end > self._start and self._buf[line_end - 1] == 0x0D:
+                line_end -= 1
+            yield self._view[self._start:line_end]
+            self._start = scan = nl + 1
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def flush(self) -> Iterator[memoryview]:
+        """流结束时产出末尾没有换行符的残留行。"""
+
+        if self._end > self._start:
+            line_end = self._end
+            if self._buf[line_end - 1] == 0x0D:
+                line_end -= 1
+            yield self._view[self._start:line_end]
+        self._start = self._end = 0
+
+    def _reserve(self, size: int) -> None:
+        pending = self._end - self._start
+        needed = pending + size
+        if needed <= len(self._buf):
+            # 容量足够：把未完成的行挪到缓冲区头部（等长切片赋值，不触发 resize）
+            self._buf[:pending] = self._buf[self._start:self._end]
+        else:
+            capacity = len(self._buf)
+            while capacity < needed:
+                capacity *= 2
+            grown = bytearray(capacity)
+            grown[:pending] = self._view[self._start:self._end]
+            self._buf = grown
+            self._view = memoryview(grown)
+        self._start = 0
+        self._end = pending
+
+
+def decode_sse_line(line: memoryview) -> Optional[Dict[str, Any]]:
+    """解析单行 SSE，返回 JSON 对象；非 data 行、空数据、[DONE] 与无法解析的行返回 None。
+
+    只比较行首固定长度的前缀，再把切片（memoryview 不复制数据）直接交给 orjson，
+    整个过程不做 strip，也不构造中间 bytes/str。
+    """
+
+    if line[:6] == b"data: ":
+        data = line[6:]
+    elif line[:5] == b"data:":
+        data = line[5:]
+    else:
+        # 空行（事件分隔）、注释行与 event:/id: 等字段均不携带增量
+        return None
+    if not data or data[:6] == b"[DONE]":
+        return None
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def iter_sse_lines(chunks: Iterable[bytes], capacity: int = DEFAULT_CAPACITY) -> Iterator[memoryview]:
+    """把响应字节块序列转换为 SSE 行序列（含流末尾的残留行）。"""
+
+    buffer = SseLineBuffer(capacity)
+    for chunk in chunks:
+        if chunk:
+            yield from buffer.feed(chunk)
+    yield from buffer.flush()
+
+
+async def aiter_sse_lines(
+    chunks: AsyncIterable[bytes], capacity: int = DEFAULT_CAPACITY
+) -> AsyncIterator[memoryview]:
+    """iter_sse_lines 的异步版本，供 AsyncClient 的流式响应使用。"""
+
+    buffer = SseLineBuffer(capacity)
+    async for chunk in chunks:
+        if chunk:
+            for line in buffer.feed(chunk):
+                yield line
+    for line in buffer.flush():
+        yield line
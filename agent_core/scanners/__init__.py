@@ -2,12 +2,25 @@
 
 from __future__ import annotations
 
-import json
+import os
 import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict, dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Optional, Protocol
+from typing import Iterable, Iterator, List, Optional, Protocol
+
+import orjson
+
+from agent_core.tools.filesystem import iter_files
+
+try:
+    # 可选依赖：安装后 Semgrep 结果改为流式解析，避免整份 JSON 报告驻留内存
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None
 
 
 @dataclass
@@ -40,14 +53,27 @@ class Scanner(Protocol):
         ...
 
 
+def _error_output(exc: subprocess.CalledProcessError) -> str:
+    """只解码子进程错误输出的开头部分，用于错误提示。"""
+
+    raw = exc.stderr or exc.stdout or b""
+    return raw[:4096].decode("utf-8", errors="replace")
+
+
 def _command_exists(command: str) -> bool:
     return shutil.which(command) is not None
 
 
+# 判断适用性时不进入的目录（另外所有以 "." 开头的隐藏目录也会跳过）
 def _has_files(project_root: str, extensions: Iterable[str]) -> bool:
-    root = Path(project_root)
-    for ext in extensions:
-        if any(root.rglob(f"*{ext}")):
+    """单次遍历目录树，只要出现任一扩展名的文件即返回 True。
+
+    与文件工具共用 iter_files，跳过的目录保持一致。
+    """
+
+    exts = {ext.lower() for ext in extensions}
+    for entry in iter_files(project_root):
+        if os.path.splitext(entry.name)[1].lower() in exts:
             return True
     return False
 
@@ -60,37 +86,64 @@ class SemgrepScanner:
 
     def run(self, project_root: str) -> List[Issue]:
         cmd = ["semgrep", "--config", "p/owasp-top-ten", ".", "--json"]
+        if ijson is not None:
+            return [self._to_issue(entry) for entry in self._iter_streamed_results(cmd, project_root)]
         try:
             completed = subprocess.run(
                 cmd,
                 cwd=project_root,
                 capture_output=True,
-                text=True,
                 check=True,
             )
         except FileNotFoundError as exc:
             raise RuntimeError("semgrep 命令未安装") from exc
         except subprocess.CalledProcessError as exc:  # pragma: no cover - depends on env
-            raise RuntimeError(f"semgrep 执行失败: {exc.stderr or exc.stdout}") from exc
-        data = json.loads(completed.stdout or "{}")
-        issues: List[Issue] = []
-        for entry in data.get("results", []):
-            extra = entry.get("extra", {})
-            start = entry.get("start", {})
-            issues.append(
-                Issue(
-                    file=entry.get("path", ""),
-                    line=int(start.get("line") or 0),
-                    column=int(start.get("col") or 0),
-                    severity=str(extra.get("severity") or "").lower() or "info",
-                    rule_id=str(entry.get("check_id") or ""),
-                    source=self.name,
-                    message=str(extra.get("message") or ""),
-                    language=str(extra.get("engine_name") or extra.get("meta", {}).get("language") or ""),
-                    code_snippet=str(extra.get("lines") or ""),
-                )
-            )
-        return issues
+            raise RuntimeError(f"semgrep 执行失败: {_error_output(exc)}") from exc
+        data = orjson.loads(completed.stdout or b"{}")
+        return [self._to_issue(entry) for entry in data.get("results", [])]
+
+    @staticmethod
+    def _iter_streamed_results(cmd: List[str], project_root: str) -> Iterator[dict]:
+        """边读管道边解析 results 数组，内存只保留当前一条结果而非整份报告。"""
+
+        with tempfile.TemporaryFile() as stderr_file:
+            try:
+                proc = subprocess.Popen(cmd, cwd=project_root, stdout=subprocess.PIPE, stderr=stderr_file)
+            except FileNotFoundError as exc:
+                raise RuntimeError("semgrep 命令未安装") from exc
+            parse_error: Optional[Exception] = None
+            with proc:
+                assert proc.stdout is not None
+                try:
+                    yield from ijson.items(proc.stdout, "results.item")
+                except ijson.JSONError as exc:
+                    # 先等待退出码：进程失败时输出通常不完整，应报告 stderr
+                    parse_error = exc
+                    # 读空管道中剩余的输出，否则 semgrep 写满管道缓冲区后会阻塞，wait 永远不返回
+                    while proc.stdout.read(65536):
+                        pass
+                returncode = proc.wait()
+            if returncode != 0:  # pragma: no cover - depends on env
+                stderr_file.seek(0)
+                detail = stderr_file.read(4096).decode("utf-8", errors="replace")
+                raise RuntimeError(f"semgrep 执行失败: {detail}")
+            if parse_error is not None:
+                raise RuntimeError(f"semgrep 输出解析失败: {parse_error}") from parse_error
+
+    def _to_issue(self, entry: dict) -> Issue:
+        extra = entry.get("extra", {})
+        start = entry.get("start", {})
+        return Issue(
+            file=entry.get("path", ""),
+            line=int(start.get("line") or 0),
+            column=int(start.get("col") or 0),
+            severity=str(extra.get("severity") or "").lower() or "info",
+            rule_id=str(entry.get("check_id") or ""),
+            source=self.name,
+            message=str(extra.get("message") or ""),
+            language=str(extra.get("engine_name") or extra.get("meta", {}).get("language") or ""),
+            code_snippet=str(extra.get("lines") or ""),
+        )
 
 
 class BanditScanner:
@@ -106,14 +159,13 @@ class BanditScanner:
                 cmd,
                 cwd=project_root,
                 capture_output=True,
-                text=True,
                 check=True,
             )
         except FileNotFoundError as exc:
             raise RuntimeError("bandit 命令未安装") from exc
         except subprocess.CalledProcessError as exc:  # pragma: no cover
-            raise RuntimeError(f"bandit 执行失败: {exc.stderr or exc.stdout}") from exc
-        data = json.loads(completed.stdout or "{}")
+            raise RuntimeError(f"bandit 执行失败: {_error_output(exc)}") from exc
+        data = orjson.loads(completed.stdout or b"{}")
         issues: List[Issue] = []
         for entry in data.get("results", []):
             issues.append(
@@ -145,14 +197,13 @@ class ESLintScanner:
                 cmd,
                 cwd=project_root,
                 capture_output=True,
-                text=True,
                 check=True,
             )
         except FileNotFoundError as exc:
             raise RuntimeError("需要安装 Node/npm (npx 命令未找到)") from exc
         except subprocess.CalledProcessError as exc:  # pragma: no cover
-            raise RuntimeError(f"eslint 执行失败: {exc.stderr or exc.stdout}") from exc
-        data = json.loads(completed.stdout or "[]")
+            raise RuntimeError(f"eslint 执行失败: {_error_output(exc)}") from exc
+        data = orjson.loads(completed.stdout or b"[]")
         issues: List[Issue] = []
         severity_map = {1: "warning", 2: "error"}
         for file_entry in data:
@@ -182,30 +233,54 @@ SCANNERS: List[Scanner] = [
 ]
 
 
+@lru_cache(maxsize=64)
+def _is_applicable(scanner: Scanner, project_root: str) -> bool:
+    """按 (扫描器, 项目根目录) 缓存适用性判断。
+
+    is_applicable 需要遍历目录树，同一进程内对同一项目反复审查时只遍历一次；
+    项目中新增了某类语言文件后，可调用 _is_applicable.cache_clear() 重新判断。
+    """
+
+    return scanner.is_applicable(project_root)
+
+
+def _run_scanner(scanner: Scanner, project_root: str) -> List[Issue]:
+    """运行单个扫描器；失败时转换为一条 scanner_error Issue。"""
+
+    try:
+        return scanner.run(project_root)
+    except Exception as exc:
+        return [
+            Issue(
+                file="",
+                line=0,
+                column=0,
+                severity="error",
+                rule_id="scanner_error",
+                source=scanner.name,
+                message=str(exc),
+                language="",
+                code_snippet="",
+            )
+        ]
+
+
 def run_all_scanners(project_root: str) -> List[Issue]:
-    """依次运行所有适用的扫描器并合并结果。"""
+    """并行运行所有适用的扫描器并按 SCANNERS 顺序合并结果。
+
+    各扫描器都是独立的外部子进程，互不共享输出，
+    并行执行后总耗时取决于最慢的一个而不是全部之和。
+    """
 
     project_root = str(Path(project_root).expanduser().resolve())
+    applicable = [scanner for scanner in SCANNERS if _is_applicable(scanner, project_root)]
+    if not applicable:
+        return []
     aggregated: List[Issue] = []
-    for scanner in SCANNERS:
-        if not scanner.is_applicable(project_root):
-            continue
-        try:
-            aggregated.extend(scanner.run(project_root))
-        except Exception as exc:
-            aggregated.append(
-                Issue(
-                    file="",
-                    line=0,
-                    column=0,
-                    severity="error",
-                    rule_id="scanner_error",
-                    source=scanner.name,
-                    message=str(exc),
-                    language="",
-                    code_snippet="",
-                )
-            )
+    with ThreadPoolExecutor(max_workers=len(applicable)) as pool:
+        futures = [pool.submit(_run_scanner, scanner, project_root) for scanner in applicable]
+        for future in futures:
+            aggregated.extend(future.result())
     return aggregated
 
 
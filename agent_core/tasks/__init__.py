@@ -1,5 +1,5 @@
 """Task-level agent utilities (configuration, providers, runner)."""
 
-from .task_runner import TaskConfig, run_agent
+from .task_runner import TaskConfig, run_agent, run_agent_batch
 
-__all__ = ["TaskConfig", "run_agent"]
+__all__ = ["TaskConfig", "run_agent", "run_agent_batch"]
@@ -9,6 +9,7 @@ from uuid import uuid4
 
 
 TaskMode = Literal["read_only", "safe_write"]
+TraceMode = Literal["off", "on_error", "full"]
 MAX_TASK_STEPS = 20
 
 
@@ -21,12 +22,14 @@ class TaskConfig:
         max_steps: 调用 LLM+工具可执行的最大轮数（<=20）。
         project_root: 当前项目根目录，所有文件操作都必须局限在这里。
         trace_id: 可选外部 trace 标识；为空时会自动生成。
+        trace_mode: trace 落盘策略：full 全程记录，on_error 仅在任务失败时写入，off 不记录。
     """
 
     mode: TaskMode
     max_steps: int
     project_root: str
     trace_id: Optional[str] = None
+    trace_mode: TraceMode = "full"
 
     def __post_init__(self) -> None:
         if self.max_steps < 1:
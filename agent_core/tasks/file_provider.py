@@ -2,14 +2,54 @@
 
 from __future__ import annotations
 
+import os
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional, Protocol
 
+from agent_core.tools.filesystem import (
+    MAX_SEARCH_FILE_BYTES,
+    SKIP_DIRS,
+    compile_name_pattern,
+    is_binary_name,
+    iter_files,
+    looks_binary,
+)
+
 from .config import TaskConfig
 
 
+# 在通用忽略目录之外再跳过 traces：任务运行时的轨迹 JSON 与写文件前的备份都存放在
+# 项目根目录下的 traces 中，不应出现在任务自己的列表与搜索结果里
+_SKIP_DIRS = SKIP_DIRS | {"traces"}
+
+
+def _backup_copy(src: Path, dst: Path) -> None:
+    """把 src 备份到 dst，保留元数据。
+
+    优先使用 os.copy_file_range：数据在内核内拷贝，btrfs/XFS 等支持 reflink 的
+    文件系统上只共享数据块、不复制内容。不可用或失败时回退 shutil.copy2。
+    备份不能用硬链接：write_file_safe 随后原地改写目标文件，会连同备份一起改掉。
+    """
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        # 部分伪文件系统报告的大小不可信，交给 copy2 完整拷贝
+                        raise OSError("copy_file_range made no progress")
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
 class FileToolProvider(Protocol):
     """统一的文件工具接口，便于未来替换为 MCP 实现。"""
 
@@ -35,6 +75,8 @@ class LocalFileToolProvider:
     def __post_init__(self) -> None:
         self.project_root = self.project_root.resolve()
         self._backups = self.project_root / "traces" / "backups"
+        # scandir 产出的路径都以根目录为前缀，输出相对路径时直接切片
+        self._prefix_len = len(os.path.join(str(self.project_root), ""))
 
     # ---- helpers -------------------------------------------------
 
@@ -56,16 +98,11 @@ class LocalFileToolProvider:
         return resolved.read_text(encoding="utf-8")
 
     def list_files(self, pattern: Optional[str] = None, max_items: int = 200) -> List[str]:
-        from fnmatch import fnmatch
-
         matched: List[str] = []
-        pat = pattern or "*"
-        for file in self.project_root.rglob("*"):
-            if not file.is_file():
-                continue
-            rel = str(file.relative_to(self.project_root))
-            if fnmatch(file.name, pat):
-                matched.append(rel)
+        match = compile_name_pattern(pattern or "*")
+        for entry in iter_files(str(self.project_root), _SKIP_DIRS):
+            if match(entry.name):
+                matched.append(entry.path[self._prefix_len:])
                 if len(matched) >= max_items:
                     break
         return matched
@@ -73,17 +110,26 @@ class LocalFileToolProvider:
     def search(self, query: str, *, directory: Optional[str] = None, max_results: int = 50) -> List[str]:
         base = self._resolve(directory) if directory else self.project_root
         results: List[str] = []
-        for file in base.rglob("*"):
-            if not file.is_file():
+        needle = query.encode("utf-8")
+        # 大小上限与二进制判断和 search_code 共用，两套搜索在同一目录树上结果一致
+        for entry in iter_files(str(base), _SKIP_DIRS):
+            if is_binary_name(entry.name):
                 continue
             try:
-                text = file.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
+                if entry.stat().st_size > MAX_SEARCH_FILE_BYTES:
+                    continue
+                with open(entry.path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            # 绝大多数文件不包含查询串：直接在字节上判断，免去整文件 UTF-8 解码
+            if needle not in data or looks_binary(data):
                 continue
-            for line_no, line in enumerate(text.splitlines(), 1):
-                if query in line:
-                    rel = file.relative_to(self.project_root)
-                    results.append(f"{rel}:{line_no}: {line.strip()}")
+            rel = entry.path[self._prefix_len:]
+            for line_no, line in enumerate(data.splitlines(), 1):
+                if needle in line:
+                    text = line.decode("utf-8", errors="ignore")
+                    results.append(f"{rel}:{line_no}: {text.strip()}")
                     if len(results) >= max_results:
                         return results
         return results
@@ -98,7 +144,7 @@ class LocalFileToolProvider:
         if resolved.exists():
             backup_path = self._backups / rel
             backup_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(resolved, backup_path)
+            _backup_copy(resolved, backup_path)
         resolved.write_text(new_content, encoding="utf-8")
         info = {
             "status": "ok",
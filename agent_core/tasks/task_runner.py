@@ -2,19 +2,130 @@
 
 from __future__ import annotations
 
-import json
-from typing import Optional
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
 
 from agent_core.config.settings import settings
 from agent_core.domain.models import ChatMessage, ChatRequest
 from agent_core.providers import create_provider
-from agent_core.tools.definitions import ToolCall
+from agent_core.tools.definitions import ToolCall, ToolDef
 
 from .config import TaskConfig, MAX_TASK_STEPS
 from .file_provider import FileToolProvider, LocalFileToolProvider
 from .tools import get_tool_spec, task_tool_defs
 from .trace import TraceRecorder
 
+# 工具调用以文件读取/搜索等 I/O 为主，同一轮的多个调用并发执行；
+# 线程池在首次使用时按配置创建，配置异常时退回默认并发数
+_DEFAULT_TOOL_CONCURRENCY = 8
+_TOOL_POOL: Optional[ThreadPoolExecutor] = None
+_TOOL_POOL_LOCK = threading.Lock()
+
+# 工具定义与系统提示词在导入时构造一次，所有任务共享（只读，不要原地修改）
+_TOOL_DEFS: List[ToolDef] = task_tool_defs()
+# 工具 schema 在进程内不变，只序列化一次，每轮请求由 Provider 直接拼接
+_TOOL_DEFS_JSON: bytes = orjson.dumps([td.to_openai_schema() for td in _TOOL_DEFS])
+_SYSTEM_PROMPT_TEMPLATE = (
+    "你是一名经验丰富的本地代码助手。"
+    "如果任务复杂，请先给出简要计划，再执行工具。"
+    "每一轮回复都要评估是否已经完成任务，若已完成则停止调用工具并总结结论。"
+    "你的操作范围仅限于项目根目录: {project_root}。"
+    "可以使用 read_file/list_project_files/search_in_files/write_file_safe 等工具。"
+    "写操作只能在 safe_write 模式下执行，并确保说明修改原因。"
+)
+
+# Provider 客户端（含 HTTP 连接池）与文件工具按 key 复用，避免每个任务重新建连
+_PROVIDER_CACHE: Dict[str, Any] = {}
+_FILE_PROVIDER_CACHE: Dict[str, LocalFileToolProvider] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+# 单个任务内缓存的只读工具结果条数上限
+_TOOL_CACHE_SIZE = 64
+
+# 任务开始时趁等待首轮 LLM 响应，预读这些模型常在第一步读取的项目清单文件
+PREWARM_FILES: Tuple[str, ...] = ("README.md", "pyproject.toml", "package.json", "requirements.txt", "setup.py")
+_PREWARM_MAX_BYTES = 256 * 1024
+
+
+class _ToolResultCache:
+    """任务级只读工具结果缓存，按 (工具名, 规范化参数) 做 LRU 淘汰。
+
+    模型在多轮规划中经常重复读取同一文件或重复搜索，命中时直接复用上次的结果。
+    同一轮的工具调用可能并发执行，读写都在锁内完成；写工具成功后整体清空，避免返回旧内容。
+    """
+
+    def __init__(self, maxsize: int = _TOOL_CACHE_SIZE) -> None:
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, bytes], str]" = OrderedDict()
+        # 由预读写入、尚未被模型真正请求过的条目
+        self._speculative: Set[Tuple[str, bytes]] = set()
+        # 每次 clear 递增，防止清空前开始的预读把旧内容写回
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, args: Dict[str, Any]) -> Tuple[str, bytes]:
+        return name, orjson.dumps(args, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[Tuple[str, str]]:
+        """命中时返回 (内容, 命中类型)，命中类型用于 trace 标记。"""
+
+        with self._lock:
+            content = self._entries.get(key)
+            if content is None:
+                return None
+            self._entries.move_to_end(key)
+            if key in self._speculative:
+                self._speculative.discard(key)
+                return content, "speculative-hit"
+            return content, "cached-hit"
+
+    def put(self, key: Tuple[str, bytes], content: str) -> None:
+        with self._lock:
+            self._store(key, content)
+            self._speculative.discard(key)
+
+    def put_speculative(self, key: Tuple[str, bytes], content: str, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation or key in self._entries:
+                return
+            self._store(key, content)
+            self._speculative.add(key)
+
+    def _store(self, key: Tuple[str, bytes], content: str) -> None:
+        self._entries[key] = content
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._speculative.discard(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._speculative.clear()
+            self.generation += 1
+
+
+def _prewarm(file_provider: FileToolProvider, config: TaskConfig, cache: _ToolResultCache) -> None:
+    """只读预热：把存在且不超过大小上限的清单文件按 read_file 的结果格式放入缓存。"""
+
+    generation = cache.generation
+    for name in PREWARM_FILES:
+        try:
+            if os.stat(os.path.join(config.project_root, name)).st_size > _PREWARM_MAX_BYTES:
+                continue
+            content = file_provider.read_file(name)
+        except (OSError, UnicodeDecodeError):
+            continue
+        cache.put_speculative(cache.key("read_file", {"path": name}), content, generation)
+
 
 def run_agent(
     user_input: str,
@@ -28,58 +139,190 @@ def run_agent(
     provider_key = provider_name or getattr(settings, "default_provider", "glm")
     model_key = model_name or getattr(settings, "default_model", "ide-chat")
     config.ensure_trace_id()
-    file_provider = LocalFileToolProvider(config.root_path)
-    trace = TraceRecorder(config)
-    provider_client = create_provider(provider_key)
+    file_provider = _get_file_provider(config)
+    provider_client = _get_provider(provider_key)
 
     system_prompt = _build_system_prompt(config)
     messages = [
         ChatMessage(role="system", content=system_prompt),
         ChatMessage(role="user", content=user_input, meta={"task_mode": config.mode}),
     ]
-    tool_defs = task_tool_defs()
-
-    for step in range(config.max_steps_clamped):
-        req = ChatRequest(
-            provider=provider_key,
-            model=model_key,
-            messages=messages,
-            temperature=0.3,
-            tools=tool_defs,
-            tool_choice="auto",
-        )
-        result = provider_client.chat(req)
-        assistant_msg = result.choices[0].message
-        messages.append(assistant_msg)
-        summary = _summary(assistant_msg.content)
-        trace.record_llm_step(step, has_tool_calls=bool(assistant_msg.tool_calls), summary=summary)
-
-        if not assistant_msg.tool_calls:
-            final_content = assistant_msg.content or ""
-            trace.finalize("ok", final_content)
-            return final_content
-
-        for tool_call in assistant_msg.tool_calls:
-            tool_response = _execute_tool_call(tool_call, config, file_provider, trace, step)
-            messages.append(
-                ChatMessage(
-                    role="tool",
-                    content=tool_response,
-                    tool_call_id=tool_call.id,
-                )
+    tool_cache = _ToolResultCache()
+    # 每轮请求只有 messages 在变化（同一个列表原地追加，ChatRequest 不做拷贝）
+    base_req_kwargs: Dict[str, Any] = dict(
+        provider=provider_key,
+        model=model_key,
+        temperature=0.3,
+        tools=_TOOL_DEFS,
+        prebuilt_tools_json=_TOOL_DEFS_JSON,
+        tool_choice="auto",
+    )
+
+    # 记录器会启动后台 flush 线程并打开 sidecar 文件，必须紧挨着 try 创建，
+    # 之后的任何异常都要经过 finalize 收尾
+    trace = TraceRecorder.for_config(config)
+    try:
+        # 与首轮 LLM 调用并行执行；预读失败或未被用到都不影响任务本身
+        _get_tool_pool().submit(_prewarm, file_provider, config, tool_cache)
+        for step in range(config.max_steps_clamped):
+            req = ChatRequest(messages=messages, **base_req_kwargs)
+            result = provider_client.chat(req)
+            assistant_msg = result.choices[0].message
+            messages.append(assistant_msg)
+            trace.record_llm_step(step, has_tool_calls=bool(assistant_msg.tool_calls), content=assistant_msg.content)
+
+            if not assistant_msg.tool_calls:
+                final_content = assistant_msg.content or ""
+                trace.finalize("ok", final_content)
+                return final_content
+
+            # 工具执行期间主线程没有可重叠的工作：下一轮请求依赖全部工具结果，
+            # payload 的构造与编码都在 provider.chat 内部完成
+            tool_responses = _execute_tool_calls(
+                assistant_msg.tool_calls, config, file_provider, trace, step, tool_cache
             )
+            for tool_call, tool_response in zip(assistant_msg.tool_calls, tool_responses):
+                messages.append(
+                    ChatMessage(
+                        role="tool",
+                        content=tool_response,
+                        tool_call_id=tool_call.id,
+                    )
+                )
+    except Exception as exc:
+        # 后台 flush 线程要等 finalize 才退出，异常时同样收尾并记录原因
+        trace.finalize("error", str(exc))
+        raise
 
     final_text = f"本次任务超过最大步骤限制（{config.max_steps_clamped}/{MAX_TASK_STEPS}），已自动停止。"
     trace.finalize("max_steps_exceeded", final_text)
     return final_text
 
 
+def run_agent_batch(
+    inputs: List[str],
+    config: TaskConfig,
+    *,
+    provider_name: Optional[str] = None,
+    model_name: Optional[str] = None,
+    max_concurrency: int = 10,
+) -> List[str]:
+    """并发执行多个相互独立的任务，返回值顺序与 inputs 一致。
+
+    每个任务的耗时主要是等待 LLM 响应，线程池并发后总耗时接近最慢的任务而不是全部之和。
+    每个任务使用 config 的独立副本与各自的 trace_id（config 指定了 trace_id 时追加序号）。
+    """
+
+    if not inputs:
+        return []
+    configs = [
+        replace(config, trace_id=f"{config.trace_id}-{idx}" if config.trace_id else None)
+        for idx in range(len(inputs))
+    ]
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(inputs)), thread_name_prefix="task-batch") as pool:
+        futures = [
+            pool.submit(run_agent, user_input, task_config, provider_name=provider_name, model_name=model_name)
+            for user_input, task_config in zip(inputs, configs)
+        ]
+        return [future.result() for future in futures]
+
+
+def _get_provider(provider_key: str) -> Any:
+    client = _PROVIDER_CACHE.get(provider_key)
+    if client is None:
+        with _REGISTRY_LOCK:
+            client = _PROVIDER_CACHE.get(provider_key)
+            if client is None:
+                client = create_provider(provider_key)
+                _PROVIDER_CACHE[provider_key] = client
+    return client
+
+
+def _get_file_provider(config: TaskConfig) -> LocalFileToolProvider:
+    # LocalFileToolProvider 不保存任务状态，同一项目根目录的任务可以共用
+    provider = _FILE_PROVIDER_CACHE.get(config.project_root)
+    if provider is None:
+        with _REGISTRY_LOCK:
+            provider = _FILE_PROVIDER_CACHE.get(config.project_root)
+            if provider is None:
+                provider = LocalFileToolProvider(config.root_path)
+                _FILE_PROVIDER_CACHE[config.project_root] = provider
+    return provider
+
+
+def _tool_concurrency_limit() -> int:
+    limit = getattr(settings, "tool_concurrency_limit", _DEFAULT_TOOL_CONCURRENCY)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return _DEFAULT_TOOL_CONCURRENCY
+    return limit if limit >= 1 else _DEFAULT_TOOL_CONCURRENCY
+
+
+def _get_tool_pool() -> ThreadPoolExecutor:
+    global _TOOL_POOL
+    pool = _TOOL_POOL
+    if pool is None:
+        with _TOOL_POOL_LOCK:
+            pool = _TOOL_POOL
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=_tool_concurrency_limit(), thread_name_prefix="task-tool")
+                _TOOL_POOL = pool
+    return pool
+
+
+@atexit.register
+def _close_providers() -> None:
+    """进程退出时关闭缓存的 Provider 连接池。"""
+
+    with _REGISTRY_LOCK:
+        clients = list(_PROVIDER_CACHE.values())
+        _PROVIDER_CACHE.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close is not None:
+            close()
+
+
+def _execute_tool_calls(
+    calls: List[ToolCall],
+    config: TaskConfig,
+    file_provider: FileToolProvider,
+    trace: TraceRecorder,
+    step: int,
+    cache: _ToolResultCache,
+) -> List[str]:
+    """执行同一轮的全部工具调用，返回值顺序与 calls 一致。
+
+    只读工具互不影响，提交到工具线程池并发执行；批次中含有会真正生效的
+    写工具（非 read_only 模式）时按原顺序串行执行，保证读写先后符合模型预期。
+    """
+
+    if len(calls) == 1 or _has_effective_write(calls, config):
+        return [_execute_tool_call(call, config, file_provider, trace, step, cache) for call in calls]
+    pool = _get_tool_pool()
+    futures = [pool.submit(_execute_tool_call, call, config, file_provider, trace, step, cache) for call in calls]
+    return [future.result() for future in futures]
+
+
+def _has_effective_write(calls: List[ToolCall], config: TaskConfig) -> bool:
+    if config.mode == "read_only":
+        # read_only 模式下写工具会直接被拒绝，不产生副作用
+        return False
+    for call in calls:
+        spec = get_tool_spec(call.name or "")
+        if spec and spec.is_write:
+            return True
+    return False
+
+
 def _execute_tool_call(
     call: ToolCall,
     config: TaskConfig,
     file_provider: FileToolProvider,
     trace: TraceRecorder,
     step: int,
+    cache: _ToolResultCache,
 ) -> str:
     args = call.arguments or {}
     spec = get_tool_spec(call.name or "")
@@ -88,49 +331,52 @@ def _execute_tool_call(
             "error": "UNKNOWN_TOOL",
             "message": f"Tool '{call.name}' not registered",
         }
-        trace.record_tool_step(step, tool_name=call.name or "", args=args, result_summary=None, error=error)
-        return json.dumps(error, ensure_ascii=False)
+        trace.record_tool_step(step, tool_name=call.name or "", args=args, error=error)
+        return _dumps(error)
 
     if config.mode == "read_only" and spec.is_write:
         error = {
             "error": "WRITE_DISALLOWED_IN_READ_ONLY_MODE",
             "message": "当前任务处于 read_only 模式，禁止写入文件。",
         }
-        trace.record_tool_step(step, tool_name=spec.name, args=args, result_summary=None, error=error)
-        return json.dumps(error, ensure_ascii=False)
+        trace.record_tool_step(step, tool_name=spec.name, args=args, error=error)
+        return _dumps(error)
+
+    cache_key = None
+    if not spec.is_write:
+        cache_key = cache.key(spec.name, args)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            content, cache_status = cached
+            trace.record_tool_step(step, tool_name=spec.name, args=args, result=content, cache_status=cache_status)
+            return content
 
     try:
         raw = spec.handler(args, config, file_provider)
-        if isinstance(raw, str):
-            content = raw
+        content = raw if spec.returns_str else _dumps(raw)
+        cache_status = None
+        if cache_key is None:
+            # 写入可能让任何已缓存的读取结果过期
+            cache.clear()
         else:
-            content = json.dumps(raw, ensure_ascii=False)
-        trace.record_tool_step(step, tool_name=spec.name, args=args, result_summary=_summary(content))
+            cache.put(cache_key, content)
+            cache_status = "cached-miss"
+        trace.record_tool_step(step, tool_name=spec.name, args=args, result=content, cache_status=cache_status)
         return content
     except Exception as exc:  # noqa: BLE001 - 需要把异常转换为工具错误
         error = {
             "error": "TOOL_EXECUTION_ERROR",
             "message": str(exc),
         }
-        trace.record_tool_step(step, tool_name=spec.name, args=args, result_summary=None, error=error)
-        return json.dumps(error, ensure_ascii=False)
+        trace.record_tool_step(step, tool_name=spec.name, args=args, error=error)
+        return _dumps(error)
 
 
-def _build_system_prompt(config: TaskConfig) -> str:
-    return (
-        "你是一名经验丰富的本地代码助手。"
-        "如果任务复杂，请先给出简要计划，再执行工具。"
-        "每一轮回复都要评估是否已经完成任务，若已完成则停止调用工具并总结结论。"
-        f"你的操作范围仅限于项目根目录: {config.project_root}。"
-        "可以使用 read_file/list_project_files/search_in_files/write_file_safe 等工具。"
-        "写操作只能在 safe_write 模式下执行，并确保说明修改原因。"
-    )
+def _dumps(value: Any) -> str:
+    """工具结果/错误序列化为发给模型的 JSON 字符串（orjson 直接输出 UTF-8）。"""
+
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
 
 
-def _summary(text: Optional[str], limit: int = 160) -> str:
-    if not text:
-        return ""
-    text = text.strip()
-    if len(text) <= limit:
-        return text
-    return text[:limit] + "..."
+def _build_system_prompt(config: TaskConfig) -> str:
+    return _SYSTEM_PROMPT_TEMPLATE.format(project_root=config.project_root)
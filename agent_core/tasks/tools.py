@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional
 
@@ -22,6 +21,8 @@ class ToolSpec:
     definition: ToolDef
     handler: ToolHandler
     is_write: bool = False
+    # handler 直接返回发给模型的字符串；否则返回 JSON 可序列化对象，由调用方统一序列化
+    returns_str: bool = False
 
 
 def _make_tool_defs() -> Dict[str, ToolSpec]:
@@ -34,6 +35,7 @@ def _make_tool_defs() -> Dict[str, ToolSpec]:
         ToolSpec(
             name="read_file",
             is_write=False,
+            returns_str=True,
             definition=ToolDef(
                 name="read_file",
                 description="读取项目内指定文件的完整内容",
@@ -50,10 +52,10 @@ def _make_tool_defs() -> Dict[str, ToolSpec]:
         )
     )
 
-    def _list_handler(args: Dict[str, Any], _cfg: TaskConfig, provider: FileToolProvider) -> str:
+    def _list_handler(args: Dict[str, Any], _cfg: TaskConfig, provider: FileToolProvider) -> Dict[str, Any]:
         pattern = args.get("pattern")
         pattern = str(pattern) if pattern else None
-        return json.dumps({"files": provider.list_files(pattern)}, ensure_ascii=False)
+        return {"files": provider.list_files(pattern)}
 
     add(
         ToolSpec(
@@ -75,7 +77,7 @@ def _make_tool_defs() -> Dict[str, ToolSpec]:
         )
     )
 
-    def _search_handler(args: Dict[str, Any], _cfg: TaskConfig, provider: FileToolProvider) -> str:
+    def _search_handler(args: Dict[str, Any], _cfg: TaskConfig, provider: FileToolProvider) -> Dict[str, Any]:
         query = str(args.get("query") or "").strip()
         if not query:
             raise ValueError("query is required")
@@ -84,7 +86,7 @@ def _make_tool_defs() -> Dict[str, ToolSpec]:
             directory=str(args.get("directory") or "") or None,
             max_results=int(args.get("max_results") or 50),
         )
-        return json.dumps({"results": matches}, ensure_ascii=False)
+        return {"results": matches}
 
     add(
         ToolSpec(
@@ -118,12 +120,12 @@ def _make_tool_defs() -> Dict[str, ToolSpec]:
         )
     )
 
-    def _write_handler(args: Dict[str, Any], config: TaskConfig, provider: FileToolProvider) -> str:
+    def _write_handler(args: Dict[str, Any], config: TaskConfig, provider: FileToolProvider) -> Dict[str, str]:
         path = str(args.get("path") or "")
         content = str(args.get("new_content") or "")
         reason = str(args.get("reason") or "llm_request")
         info = provider.write_file_safe(path, content, reason=reason, config=config)
-        return json.dumps(info, ensure_ascii=False)
+        return info
 
     add(
         ToolSpec(
@@ -157,9 +159,9 @@ def _make_tool_defs() -> Dict[str, ToolSpec]:
         )
     )
 
-    def _scan_handler(args: Dict[str, Any], config: TaskConfig, _provider: FileToolProvider) -> str:
-        issues = run_all_scanners(config.project_root)
-        return json.dumps({"issues": [issue.to_dict() for issue in issues]}, ensure_ascii=False)
+    def _scan_handler(args: Dict[str, Any], config: TaskConfig, _provider: FileToolProvider) -> Dict[str, Any]:
+        # Issue 是 dataclass，序列化时由 orjson 直接处理，无需逐个 asdict
+        return {"issues": run_all_scanners(config.project_root)}
 
     add(
         ToolSpec(
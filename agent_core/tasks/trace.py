@@ -2,26 +2,163 @@
 
 from __future__ import annotations
 
-import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Optional, Protocol, Set, Union
+
+import orjson
 
 from .config import TaskConfig
+from .tools import task_tool_defs
+
+
+# 后台线程把 steps sidecar 的写缓冲刷到磁盘的间隔（秒）
+_FLUSH_INTERVAL = 0.25
+_STEPS_BUFFER_SIZE = 65536
+
+
+# 已确认存在的 traces 目录：常驻进程里同一项目的后续任务不再重复 mkdir
+_DIR_CACHE: Set[Path] = set()
+_DIR_LOCK = threading.Lock()
+
+
+def _ensure_dir(path: Path) -> None:
+    if path in _DIR_CACHE:
+        return
+    with _DIR_LOCK:
+        if path not in _DIR_CACHE:
+            path.mkdir(parents=True, exist_ok=True)
+            _DIR_CACHE.add(path)
+
+
+# 同一毫秒内的多条记录（如并发的工具调用）共用一个时间戳字符串
+_TS_WINDOW = 0.001
+_ts_cache = (float("-inf"), "")
 
 
 def _utcnow() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    global _ts_cache
+    now = time.monotonic()
+    cached_at, cached = _ts_cache
+    if now - cached_at < _TS_WINDOW:
+        return cached
+    stamp = datetime.now(timezone.utc).isoformat()
+    # 整体替换元组，多线程下读到的总是一致的 (时刻, 字符串) 对
+    _ts_cache = (now, stamp)
+    return stamp
+
+
+@dataclass(slots=True)
+class LlmStepEntry:
+    """一次 LLM 调用的 trace 记录；orjson 直接序列化 dataclass，字段顺序即输出顺序。"""
+
+    type: str = field(default="llm", init=False)
+    step: int
+    timestamp: str
+    has_tool_calls: bool
+    response_summary: str
+
+
+@dataclass(slots=True)
+class ToolStepEntry:
+    """一次工具调用的 trace 记录。"""
+
+    type: str = field(default="tool", init=False)
+    step: int
+    timestamp: str
+    tool_name: str
+    args: Dict[str, Any]
+    result_summary: Optional[str]
+
+
+@dataclass(slots=True)
+class ToolErrorStepEntry(ToolStepEntry):
+    """执行失败的工具调用，额外带上 error（成功的记录不输出该字段）。"""
+
+    error: Dict[str, Any]
+
+
+StepEntry = Union[LlmStepEntry, ToolStepEntry]
+
+
+class TraceRecorder(Protocol):
+    """任务 trace 记录接口，具体实现由 TaskConfig.trace_mode 决定。
 
+    record_* 接收原始的回复/工具结果文本，摘要由记录器按需生成；
+    不落盘的实现因此完全省去摘要的字符串处理。
+    """
 
-class TraceRecorder:
-    """把单次任务的关键信息写入 JSON 文件，便于审计。"""
+    def record_llm_step(self, step: int, *, has_tool_calls: bool, content: Optional[str]) -> None:
+        ...
+
+    def record_tool_step(
+        self,
+        step: int,
+        *,
+        tool_name: str,
+        args: Dict[str, Any],
+        result: Optional[str] = None,
+        cache_status: Optional[str] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        ...
+
+    def finalize(self, status: str, final_reply: str) -> None:
+        ...
+
+    @staticmethod
+    def for_config(config: TaskConfig) -> "TraceRecorder":
+        """按 trace_mode 选择实现：off 不记录，on_error 仅失败时落盘，full 全程落盘。"""
+
+        if config.trace_mode == "off":
+            return NoopTraceRecorder()
+        if config.trace_mode == "on_error":
+            return DeferredTraceRecorder(config)
+        return EagerTraceRecorder(config)
+
+
+class NoopTraceRecorder:
+    """trace_mode=off：不记录任何内容。"""
+
+    def record_llm_step(self, step: int, *, has_tool_calls: bool, content: Optional[str]) -> None:
+        pass
+
+    def record_tool_step(
+        self,
+        step: int,
+        *,
+        tool_name: str,
+        args: Dict[str, Any],
+        result: Optional[str] = None,
+        cache_status: Optional[str] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        pass
+
+    def finalize(self, status: str, final_reply: str) -> None:
+        pass
+
+
+class DeferredTraceRecorder:
+    """trace_mode=on_error：步骤只保存在内存，任务未成功结束时才写入 JSON 文件。
+
+    成功的任务全程没有磁盘 I/O。同一轮的工具调用可能在多个线程中并发记录，
+    对 data 的修改都在 _lock 内完成。JSON 文件先写临时文件再 os.replace，
+    读取方不会看到写了一半的内容。
+    """
 
     def __init__(self, config: TaskConfig):
         self.config = config
         config.ensure_trace_id()
-        traces_dir = config.root_path / "traces"
-        traces_dir.mkdir(parents=True, exist_ok=True)
-        self.path = traces_dir / f"{config.trace_id}.json"
+        self.traces_dir = config.root_path / "traces"
+        self.path = self.traces_dir / f"{config.trace_id}.json"
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._lock = threading.Lock()
         self.data: Dict[str, Any] = {
             "trace_id": config.trace_id,
             "mode": config.mode,
@@ -33,22 +170,19 @@ class TraceRecorder:
             "final_reply_preview": None,
             "steps": [],
         }
-        self._flush()
-
-    def _flush(self) -> None:
-        self.path.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    def record_llm_step(self, step: int, *, has_tool_calls: bool, summary: str) -> None:
-        self.data["steps"].append(
-            {
-                "type": "llm",
-                "step": step,
-                "timestamp": _utcnow(),
-                "has_tool_calls": has_tool_calls,
-                "response_summary": summary,
-            }
-        )
-        self._flush()
+
+    def _write_json(self) -> None:
+        with self._lock:
+            body = orjson.dumps(self.data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        self._tmp_path.write_bytes(body)
+        os.replace(self._tmp_path, self.path)
+
+    def _append_step(self, entry: StepEntry) -> None:
+        with self._lock:
+            self.data["steps"].append(entry)
+
+    def record_llm_step(self, step: int, *, has_tool_calls: bool, content: Optional[str]) -> None:
+        self._append_step(LlmStepEntry(step, _utcnow(), has_tool_calls, _summary(content)))
 
     def record_tool_step(
         self,
@@ -56,34 +190,157 @@ class TraceRecorder:
         *,
         tool_name: str,
         args: Dict[str, Any],
-        result_summary: Optional[str] = None,
+        result: Optional[str] = None,
+        cache_status: Optional[str] = None,
         error: Optional[Dict[str, Any]] = None,
     ) -> None:
-        entry: Dict[str, Any] = {
-            "type": "tool",
-            "step": step,
-            "timestamp": _utcnow(),
-            "tool_name": tool_name,
-            "args": _trim_args(args),
-            "result_summary": result_summary,
-        }
+        trimmed = _TRIMMERS.get(tool_name, _trim_args)(args)
+        summary = _result_summary(result, cache_status)
         if error:
-            entry["error"] = error
-        self.data["steps"].append(entry)
-        self._flush()
+            entry: ToolStepEntry = ToolErrorStepEntry(step, _utcnow(), tool_name, trimmed, summary, error)
+        else:
+            entry = ToolStepEntry(step, _utcnow(), tool_name, trimmed, summary)
+        self._append_step(entry)
+
+    def _set_final(self, status: str, final_reply: str) -> None:
+        with self._lock:
+            self.data["finished_at"] = _utcnow()
+            self.data["final_status"] = status
+            self.data["final_reply_preview"] = (final_reply or "")[:400]
 
     def finalize(self, status: str, final_reply: str) -> None:
-        self.data["finished_at"] = _utcnow()
-        self.data["final_status"] = status
-        self.data["final_reply_preview"] = (final_reply or "")[:400]
-        self._flush()
+        self._set_final(status, final_reply)
+        if status == "ok":
+            return
+        _ensure_dir(self.traces_dir)
+        self._write_json()
+
+
+class EagerTraceRecorder(DeferredTraceRecorder):
+    """trace_mode=full：把单次任务的关键信息全程写入 JSON 文件，便于审计。
+
+    任务进行中 `{trace_id}.json` 只在开始时写入一次任务头（steps 为空），
+    每个步骤作为一行 JSON 追加到 `{trace_id}.steps.jsonl`，单步写入量只与该步大小有关；
+    后台线程按 _FLUSH_INTERVAL 把 sidecar 的写缓冲刷到磁盘，不阻塞 Agent 主循环。
+    finalize 把全部步骤合并回 `{trace_id}.json` 并删除 sidecar，最终文件格式不变。
+    """
+
+    def __init__(self, config: TaskConfig):
+        super().__init__(config)
+        _ensure_dir(self.traces_dir)
+        self.steps_path = self.traces_dir / f"{config.trace_id}.steps.jsonl"
+        self._dirty = threading.Event()
+        self._stopping = threading.Event()
+        self._write_json()
+        self._steps_fp = self.steps_path.open("ab", buffering=_STEPS_BUFFER_SIZE)
+        self._flusher = threading.Thread(target=self._flush_loop, name="trace-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._dirty.wait()
+            # 攒一个间隔再刷；期间 finalize 被调用则交由 finalize 收尾
+            if self._stopping.wait(_FLUSH_INTERVAL):
+                return
+            self._dirty.clear()
+            with self._lock:
+                self._steps_fp.flush()
+
+    def _append_step(self, entry: StepEntry) -> None:
+        line = orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        with self._lock:
+            self.data["steps"].append(entry)
+            self._steps_fp.write(line)
+        self._dirty.set()
+
+    def finalize(self, status: str, final_reply: str) -> None:
+        self._stopping.set()
+        self._dirty.set()
+        self._flusher.join()
+        with self._lock:
+            self._steps_fp.close()
+        self._set_final(status, final_reply)
+        self._write_json()
+        # 步骤已合并进最终 JSON
+        self.steps_path.unlink(missing_ok=True)
+
+
+# 超过该长度的文本只检查两端，不再整段 strip
+_SUMMARY_EDGE = 64
+
+
+def _summary(text: Optional[str], limit: int = 160) -> str:
+    if not text:
+        return ""
+    if len(text) <= limit and not (text[0].isspace() or text[-1].isspace()):
+        return text
+    if len(text) > limit + 2 * _SUMMARY_EDGE:
+        # 结果只取决于两端：开头一段去掉前导空白后已超长、末尾一段又含非空白字符时，
+        # 完整 strip 后的文本必然以 head 开头且长于 limit，无需复制整段内容
+        # （工具结果通常以换行结尾，不能只看最后一个字符）
+        head = text[: limit + _SUMMARY_EDGE].lstrip()
+        if len(head) > limit and text[-_SUMMARY_EDGE:].rstrip():
+            return head[:limit] + "..."
+    text = text.strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit] + "..."
+
+
+def _result_summary(result: Optional[str], cache_status: Optional[str]) -> Optional[str]:
+    if result is None:
+        return None
+    if cache_status:
+        return f"{_summary(result)} [{cache_status}]"
+    return _summary(result)
+
+
+# trace 中单个字符串参数保留的最大长度
+_ARG_LIMIT = 200
 
 
 def _trim_args(args: Dict[str, Any]) -> Dict[str, Any]:
     trimmed: Dict[str, Any] = {}
     for key, value in args.items():
-        if isinstance(value, str) and len(value) > 200:
-            trimmed[key] = value[:200] + "..."
+        if isinstance(value, str) and len(value) > _ARG_LIMIT:
+            trimmed[key] = value[:_ARG_LIMIT] + "..."
         else:
             trimmed[key] = value
     return trimmed
+
+
+def _make_trimmer(params: FrozenSet[str], string_params: FrozenSet[str]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """按工具 schema 生成专用的参数裁剪函数：先检查声明为 string 的参数。
+
+    模型不一定遵守 schema，声明为其他类型的参数里出现的超长字符串同样裁剪。
+    """
+
+    other_params = tuple(params - string_params)
+
+    def trim(args: Dict[str, Any]) -> Dict[str, Any]:
+        if not params.issuperset(args):
+            # 模型传了 schema 之外的参数，退回逐项检查
+            return _trim_args(args)
+        trimmed = args
+        for key in chain(string_params, other_params):
+            value = args.get(key)
+            if isinstance(value, str) and len(value) > _ARG_LIMIT:
+                if trimmed is args:
+                    trimmed = dict(args)
+                trimmed[key] = value[:_ARG_LIMIT] + "..."
+        return trimmed
+
+    return trim
+
+
+def _build_trimmers() -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+    trimmers = {}
+    for tool in task_tool_defs():
+        string_params = frozenset(
+            name for name, param in tool.params.items() if (param.schema or {}).get("type", "string") == "string"
+        )
+        trimmers[tool.name] = _make_trimmer(frozenset(tool.params), string_params)
+    return trimmers
+
+
+_TRIMMERS = _build_trimmers()
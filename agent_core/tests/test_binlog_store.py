@@ -0,0 +1,54 @@
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+from agent_core.infrastructure.storage.binlog_store import BinLogConversationStore
+from agent_core.domain.conversation import MessageRecord
+
+
+def _record(conv_id: str, mid: str, created_at: datetime) -> MessageRecord:
+    return MessageRecord(
+        id=mid,
+        conversation_id=conv_id,
+        role="user",
+        content=f"内容-{mid}",
+        parent_id=None,
+        depth=0,
+        version=1,
+        created_at=created_at,
+        meta={"provider": "kimi"},
+    )
+
+
+def test_binlog_store_roundtrip():
+    with tempfile.TemporaryDirectory() as d:
+        store = BinLogConversationStore(root=Path(d) / ".storage")
+        conv = store.create_conversation("ide-helper", {"title": "bin"})
+        now = datetime.now(timezone.utc)
+        store.add_message(_record(conv.id, "m2", now))
+        store.add_message(_record(conv.id, "m1", now - timedelta(seconds=1)))
+        msgs = store.list_messages(conv.id)
+        assert [m.id for m in msgs] == ["m1", "m2"]
+        assert msgs[1].content == "内容-m2"
+        assert msgs[1].created_at == now
+        assert store.get_message("m1").id == "m1"
+        assert store.get_conversation(conv.id).meta["provider"] == "kimi"
+
+
+def test_binlog_store_reads_legacy_jsonl_and_skips_truncated_frame():
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d) / ".storage"
+        store = BinLogConversationStore(root=root)
+        conv = store.create_conversation("ide-helper", {"title": "mixed"})
+        now = datetime.now(timezone.utc)
+        conv_dir = root / "conversations" / conv.id
+        (conv_dir / "messages.jsonl").write_text(
+            '{"id": "old", "conversation_id": "%s", "role": "user", "content": "legacy",'
+            ' "parent_id": null, "depth": 0, "version": 1, "created_at": "2020-01-01T00:00:00Z", "meta": {}}\n'
+            % conv.id,
+            encoding="utf-8",
+        )
+        store.add_message(_record(conv.id, "new", now))
+        with (conv_dir / "messages.bin").open("ab") as f:
+            f.write(b"\xff\x00\x00\x00{")
+        assert [m.id for m in store.list_messages(conv.id)] == ["old", "new"]
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from agent_core.tasks.config import TaskConfig
+from agent_core.tasks.file_provider import LocalFileToolProvider
+
+
+def _make_tree(root: Path) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "mod.py").write_text("import os\n# TODO: fix\n", encoding="utf-8")
+    (root / "README.md").write_text("TODO list\n", encoding="utf-8")
+    for skipped in (".git", "node_modules", "traces", "__pycache__"):
+        (root / skipped).mkdir()
+        (root / skipped / "hidden.py").write_text("# TODO: ignored\n", encoding="utf-8")
+
+
+def test_local_provider_list_and_search(tmp_path):
+    _make_tree(tmp_path)
+    provider = LocalFileToolProvider(tmp_path)
+    assert provider.list_files("*.py") == [str(Path("pkg") / "mod.py")]
+    assert provider.list_files("m?d.[pq]y") == [str(Path("pkg") / "mod.py")]
+    assert provider.list_files("README.md") == ["README.md"]
+    assert sorted(provider.list_files()) == sorted(["README.md", str(Path("pkg") / "mod.py")])
+    results = provider.search("TODO")
+    assert sorted(results) == sorted(
+        ["README.md:1: TODO list", f"{Path('pkg') / 'mod.py'}:2: # TODO: fix"]
+    )
+    assert provider.search("TODO", directory="pkg") == [f"{Path('pkg') / 'mod.py'}:2: # TODO: fix"]
+
+
+def test_local_provider_write_file_safe_backs_up(tmp_path):
+    _make_tree(tmp_path)
+    provider = LocalFileToolProvider(tmp_path)
+    config = TaskConfig(mode="safe_write", max_steps=1, project_root=str(tmp_path))
+    info = provider.write_file_safe("README.md", "new", reason="test", config=config)
+    assert (tmp_path / "README.md").read_text(encoding="utf-8") == "new"
+    backup = tmp_path / info["backup_path"]
+    assert backup.read_text(encoding="utf-8") == "TODO list\n"
+
+
+def test_local_provider_backup_falls_back_to_copy2(tmp_path, monkeypatch):
+    import os
+
+    def broken_copy_file_range(*args, **kwargs):
+        raise OSError("EXDEV")
+
+    monkeypatch.setattr(os, "copy_file_range", broken_copy_file_range, raising=False)
+    _make_tree(tmp_path)
+    provider = LocalFileToolProvider(tmp_path)
+    config = TaskConfig(mode="safe_write", max_steps=1, project_root=str(tmp_path))
+    info = provider.write_file_safe("README.md", "new", reason="test", config=config)
+    assert (tmp_path / info["backup_path"]).read_text(encoding="utf-8") == "TODO list\n"
+
+
+def test_local_provider_lists_hidden_files_but_not_hidden_dirs(tmp_path):
+    _make_tree(tmp_path)
+    (tmp_path / ".editorconfig").write_text("root = true\n", encoding="utf-8")
+    provider = LocalFileToolProvider(tmp_path)
+    # 与 tools.executor 共用同一个遍历：隐藏目录剪枝，隐藏文件照常列出
+    assert provider.list_files(".*") == [".editorconfig"]
+
+
+def test_local_provider_search_skips_binary_and_large_files(tmp_path, monkeypatch):
+    from agent_core.tasks import file_provider
+
+    (tmp_path / "logo.PNG").write_bytes(b"TODO")
+    (tmp_path / "blob.dat").write_bytes(b"\x00\x01TODO")
+    (tmp_path / "big.txt").write_text("TODO\n" * 100, encoding="utf-8")
+    (tmp_path / "ok.py").write_text("# TODO\n", encoding="utf-8")
+    # 与 search_code 共用大小上限与二进制判断
+    monkeypatch.setattr(file_provider, "MAX_SEARCH_FILE_BYTES", 100)
+    provider = LocalFileToolProvider(tmp_path)
+    assert provider.search("TODO") == ["ok.py:1: # TODO"]
@@ -55,9 +55,8 @@ def test_glm_client_stream(monkeypatch):
         def __init__(self, lines):
             self._lines = list(lines)
 
-        def iter_lines(self):
-            for line in self._lines:
-                yield line
+        def iter_bytes(self):
+            yield "\n".join(self._lines).encode("utf-8")
 
     class StreamContext:
         def __init__(self, response):
@@ -1,6 +1,12 @@
+import asyncio
+import json
+
+import pytest
+
+from agent_core.domain.exceptions import RateLimitError
 from agent_core.providers.kimi_client import KimiClient
 from agent_core.domain.models import ChatRequest, ChatMessage
-from agent_core.tools.definitions import ToolDef, ToolParam
+from agent_core.tools.definitions import ToolCall, ToolDef, ToolParam
 
 
 class SettingsStub:
@@ -16,6 +22,10 @@ def test_kimi_client_parse_basic(monkeypatch):
     class Resp:
         status_code = 200
 
+        @property
+        def content(self):
+            return json.dumps(self.json()).encode("utf-8")
+
         def json(self):
             return {
                 "choices": [
@@ -72,6 +82,10 @@ def test_kimi_client_tools_payload(monkeypatch):
     class Resp:
         status_code = 200
 
+        @property
+        def content(self):
+            return json.dumps(self.json()).encode("utf-8")
+
         def json(self):
             return {"choices": [], "usage": {}}
 
@@ -96,6 +110,45 @@ def test_kimi_client_tools_payload(monkeypatch):
     assert payload["tools"][0]["function"]["name"] == "read_file"
 
 
+def test_kimi_client_splices_prebuilt_tools_json(monkeypatch):
+    kc = KimiClient(SettingsStub())
+    tool = ToolDef(
+        name="read_file",
+        description="read file",
+        params={"path": ToolParam(name="path", description="Path", required=True, schema={"type": "string"})},
+    )
+    prebuilt = json.dumps([tool.to_openai_schema()]).encode("utf-8")
+    req = ChatRequest(
+        provider="kimi",
+        model="ide-chat",
+        messages=[ChatMessage(role="user", content="hi")],
+        tools=[tool],
+        prebuilt_tools_json=prebuilt,
+    )
+    captured = {}
+
+    class Resp:
+        status_code = 200
+        content = b'{"choices": [], "usage": {}}'
+
+    class Client:
+        def __init__(self, *a, **kw):
+            pass
+
+        def post(self, url, content=None, **kw):
+            assert "json" not in kw
+            captured["body"] = content
+            return Resp()
+
+    monkeypatch.setattr("httpx.Client", Client)
+    monkeypatch.setattr(kc, "_serialize_tool", lambda tool: pytest.fail("tools should not be re-serialized"))
+    kc.chat(req)
+    body = json.loads(captured["body"])
+    assert body["tools"] == [tool.to_openai_schema()]
+    assert body["tool_choice"] == "auto"
+    assert body["messages"] == [{"role": "user", "content": "hi"}]
+
+
 def test_kimi_client_parse_tool_calls(monkeypatch):
     kc = KimiClient(SettingsStub())
     req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
@@ -103,6 +156,10 @@ def test_kimi_client_parse_tool_calls(monkeypatch):
     class Resp:
         status_code = 200
 
+        @property
+        def content(self):
+            return json.dumps(self.json()).encode("utf-8")
+
         def json(self):
             return {
                 "choices": [
@@ -161,9 +218,11 @@ def test_kimi_client_chat_stream(monkeypatch):
         def __init__(self, lines):
             self._lines = list(lines)
 
-        def iter_lines(self):
-            for line in self._lines:
-                yield line
+        def iter_bytes(self):
+            # 故意按奇数长度切块，模拟跨行的网络分块
+            data = "\r\n".join(self._lines).encode("utf-8")
+            for i in range(0, len(data), 7):
+                yield data[i:i + 7]
 
     class StreamContext:
         def __init__(self, response):
@@ -198,3 +257,305 @@ def test_kimi_client_chat_stream(monkeypatch):
     assert chunks[0].choices[0].delta.content == "hel"
     assert chunks[1].choices[0].delta.content == "lo"
     assert chunks[1].usage.total_tokens == 3
+
+
+def test_kimi_client_tool_call_arguments_cached():
+    kc = KimiClient(SettingsStub())
+    call = ToolCall(id="tool1", name="read_file", arguments={"path": "中文.py"})
+    msg = ChatMessage(role="assistant", content="", tool_calls=[call])
+
+    first = kc._message_to_payload(msg)
+    second = kc._message_to_payload(msg)
+    args_json = first["tool_calls"][0]["function"]["arguments"]
+    assert json.loads(args_json) == {"path": "中文.py"}
+    assert "中文" in args_json
+    assert second["tool_calls"][0]["function"]["arguments"] is args_json
+
+    call.arguments = {"path": "b.py"}
+    third = kc._message_to_payload(msg)
+    assert json.loads(third["tool_calls"][0]["function"]["arguments"]) == {"path": "b.py"}
+
+
+def test_kimi_client_reuses_pooled_client(monkeypatch):
+    created = []
+
+    class Resp:
+        status_code = 200
+
+        @property
+        def content(self):
+            return json.dumps(self.json()).encode("utf-8")
+
+        def json(self):
+            return {"choices": [], "usage": {}}
+
+    class Client:
+        def __init__(self, *a, **kw):
+            created.append(kw)
+            self.closed = False
+
+        def post(self, *a, **kw):
+            return Resp()
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr("httpx.Client", Client)
+    req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
+    with KimiClient(SettingsStub()) as kc:
+        kc.chat(req)
+        kc.chat(req)
+        client = kc._client
+    assert len(created) == 1
+    assert created[0]["headers"]["Authorization"] == "Bearer k"
+    assert client.closed
+
+
+def test_kimi_client_achat(monkeypatch):
+    class Resp:
+        status_code = 200
+
+        @property
+        def content(self):
+            return json.dumps(self.json()).encode("utf-8")
+
+        def json(self):
+            return {
+                "choices": [{"message": {"role": "assistant", "content": "async ok"}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }
+
+    class AsyncClient:
+        def __init__(self, *a, **kw):
+            pass
+
+        async def post(self, *a, **kw):
+            return Resp()
+
+        async def aclose(self):
+            pass
+
+    monkeypatch.setattr("httpx.AsyncClient", AsyncClient)
+    kc = KimiClient(SettingsStub())
+    req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
+
+    async def run():
+        results = await asyncio.gather(kc.achat(req), kc.achat(req))
+        await kc.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert [r.choices[0].message.content for r in results] == ["async ok", "async ok"]
+
+
+def test_kimi_client_tool_call_roundtrips_raw_arguments():
+    kc = KimiClient(SettingsStub())
+    raw = '{"query": "todo", "max_results": 5}'
+    msg = kc._build_chat_message(
+        {"role": "assistant", "tool_calls": [{"id": "t1", "function": {"name": "search_code", "arguments": raw}}]}
+    )
+    assert msg.tool_calls[0].arguments == {"query": "todo", "max_results": 5}
+    payload = kc._message_to_payload(msg)
+    assert payload["tool_calls"][0]["function"]["arguments"] is raw
+
+    broken = kc._build_chat_message(
+        {"role": "assistant", "tool_calls": [{"id": "t2", "function": {"name": "x", "arguments": "{oops"}}]}
+    )
+    sent = kc._message_to_payload(broken)["tool_calls"][0]["function"]["arguments"]
+    assert json.loads(sent) == {"_raw": "{oops"}
+
+
+def test_kimi_client_chat_batch_preserves_order(monkeypatch):
+    state = {"in_flight": 0, "peak": 0, "closed": 0}
+
+    class Resp:
+        status_code = 200
+
+        def __init__(self, text):
+            self.content = json.dumps(
+                {"choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+            ).encode("utf-8")
+
+    class AsyncClient:
+        def __init__(self, *a, **kw):
+            pass
+
+        async def post(self, url, json=None, **kw):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            return Resp(json["messages"][-1]["content"])
+
+        async def aclose(self):
+            state["closed"] += 1
+
+    monkeypatch.setattr("httpx.AsyncClient", AsyncClient)
+    kc = KimiClient(SettingsStub())
+    reqs = [
+        ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content=f"q{i}")])
+        for i in range(5)
+    ]
+    results = kc.chat_batch(reqs, max_concurrency=2)
+    assert [r.choices[0].message.content for r in results] == [f"q{i}" for i in range(5)]
+    assert state["peak"] == 2
+    assert state["closed"] == 1
+
+
+def test_kimi_client_concurrent_chat_batches_use_own_clients(monkeypatch):
+    import threading
+
+    class Resp:
+        status_code = 200
+        content = b'{"choices": [{"message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}]}'
+
+    class AsyncClient:
+        def __init__(self, *a, **kw):
+            self.loop = None
+            self.closed = False
+
+        async def post(self, *a, **kw):
+            loop = asyncio.get_running_loop()
+            self.loop = self.loop or loop
+            assert self.loop is loop and not self.closed
+            await asyncio.sleep(0.01)
+            assert not self.closed
+            return Resp()
+
+        async def aclose(self):
+            self.closed = True
+
+    monkeypatch.setattr("httpx.AsyncClient", AsyncClient)
+    kc = KimiClient(SettingsStub())
+    req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
+    errors = []
+
+    def worker():
+        try:
+            assert len(kc.chat_batch([req] * 3)) == 3
+        except BaseException as exc:  # 线程内的断言失败需要带回主线程
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(kc._aclients) == 0
+
+
+def test_kimi_client_chat_batch_sends_auth_headers(monkeypatch):
+    sent = []
+
+    class Resp:
+        status_code = 200
+        content = b'{"choices": [{"message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}]}'
+
+    class AsyncClient:
+        def __init__(self, *a, headers=None, **kw):
+            self.headers = headers or {}
+
+        async def post(self, *a, **kw):
+            sent.append(self.headers.get("Authorization"))
+            return Resp()
+
+        async def aclose(self):
+            pass
+
+    monkeypatch.setattr("httpx.AsyncClient", AsyncClient)
+    kc = KimiClient(SettingsStub())
+    req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
+    kc.chat_batch([req] * 2)
+    assert sent == [f"Bearer {SettingsStub.kimi_api_key}"] * 2
+
+def test_kimi_client_retries_rate_limit_with_retry_after(monkeypatch):
+    import agent_core.providers.kimi_client as kimi_module
+
+    class Resp:
+        def __init__(self, status_code, headers=None):
+            self.status_code = status_code
+            self.headers = headers or {}
+            self.text = "busy"
+            self.content = json.dumps(
+                {"choices": [{"message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}]}
+            ).encode("utf-8")
+
+    responses = [Resp(429, {"Retry-After": "3"}), Resp(503), Resp(200)]
+    created = []
+
+    class Client:
+        def __init__(self, *a, **kw):
+            created.append(self)
+
+        def post(self, *a, **kw):
+            return responses.pop(0)
+
+    sleeps = []
+    monkeypatch.setattr("httpx.Client", Client)
+    monkeypatch.setattr(kimi_module.time, "sleep", sleeps.append)
+    kc = KimiClient(SettingsStub())
+    req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
+    result = kc.chat(req)
+    assert result.choices[0].message.content == "ok"
+    assert len(created) == 1
+    assert sleeps[0] == 3.0
+    assert 1.0 <= sleeps[1] <= 1.5
+
+
+def test_kimi_client_gives_up_after_max_retries(monkeypatch):
+    import agent_core.providers.kimi_client as kimi_module
+
+    class Resp:
+        status_code = 429
+        headers = {}
+        text = "busy"
+
+    calls = []
+
+    class Client:
+        def __init__(self, *a, **kw):
+            pass
+
+        def post(self, *a, **kw):
+            calls.append(1)
+            return Resp()
+
+    monkeypatch.setattr("httpx.Client", Client)
+    monkeypatch.setattr(kimi_module.time, "sleep", lambda s: None)
+    kc = KimiClient(SettingsStub())
+    req = ChatRequest(provider="kimi", model="ide-chat", messages=[ChatMessage(role="user", content="hi")])
+    with pytest.raises(RateLimitError):
+        kc.chat(req)
+    assert len(calls) == 3
+
+
+def test_kimi_client_async_client_is_per_event_loop(monkeypatch):
+    created = []
+
+    class AsyncClient:
+        def __init__(self, *a, **kw):
+            created.append(self)
+            self.closed = False
+
+        async def aclose(self):
+            self.closed = True
+
+    monkeypatch.setattr("httpx.AsyncClient", AsyncClient)
+    kc = KimiClient(SettingsStub())
+
+    async def grab():
+        return kc._get_async_client(), kc._get_async_client()
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    # 同一循环内复用，新的 asyncio.run 不会拿到绑定在已关闭循环上的实例
+    assert first[0] is first[1]
+    assert second[0] is not first[0]
+
+    async def grab_and_close():
+        client = kc._get_async_client()
+        await kc.aclose()
+        return client
+
+    assert asyncio.run(grab_and_close()).closed
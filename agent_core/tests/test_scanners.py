@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+
+import orjson
+import pytest
+
+import agent_core.scanners as scanners
+from agent_core.scanners import Issue, run_all_scanners
+
+
+def _issue(source: str) -> Issue:
+    return Issue(
+        file="a.py",
+        line=1,
+        column=0,
+        severity="low",
+        rule_id="R1",
+        source=source,
+        message="m",
+        language="python",
+        code_snippet="",
+    )
+
+
+class FakeScanner:
+    def __init__(self, name, delay=0.0, applicable=True, fail=False):
+        self.name = name
+        self._delay = delay
+        self._applicable = applicable
+        self._fail = fail
+
+        self.applicable_checks = 0
+
+    def is_applicable(self, project_root):
+        self.applicable_checks += 1
+        return self._applicable
+
+    def run(self, project_root):
+        time.sleep(self._delay)
+        if self._fail:
+            raise RuntimeError("boom")
+        return [_issue(self.name)]
+
+
+def test_run_all_scanners_keeps_order_and_wraps_errors(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        scanners,
+        "SCANNERS",
+        [
+            FakeScanner("slow", delay=0.05),
+            FakeScanner("skipped", applicable=False),
+            FakeScanner("broken", fail=True),
+            FakeScanner("fast"),
+        ],
+    )
+    issues = run_all_scanners(str(tmp_path))
+    assert [i.source for i in issues] == ["slow", "broken", "fast"]
+    assert issues[1].rule_id == "scanner_error"
+    assert issues[1].message == "boom"
+
+
+def test_run_all_scanners_caches_applicability(monkeypatch, tmp_path):
+    scanner = FakeScanner("cached")
+    monkeypatch.setattr(scanners, "SCANNERS", [scanner])
+    run_all_scanners(str(tmp_path))
+    run_all_scanners(str(tmp_path))
+    assert scanner.applicable_checks == 1
+
+
+def test_has_files_skips_hidden_and_vendor_dirs(tmp_path):
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "lib.js").write_text("x", encoding="utf-8")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "hook.py").write_text("x", encoding="utf-8")
+    assert not scanners._has_files(str(tmp_path), [".js", ".py"])
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "App.TSX").write_text("x", encoding="utf-8")
+    assert scanners._has_files(str(tmp_path), [".js", ".tsx"])
+
+
+def _fake_command(monkeypatch, tmp_path, name, script):
+    """在 PATH 最前面放一个用当前解释器执行的假命令。"""
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    path = bin_dir / name
+    path.write_text(f"#!{sys.executable}\n{script}", encoding="utf-8")
+    path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+
+
+class _FakeIjson:
+    """只实现 SemgrepScanner 用到的 items/JSONError。"""
+
+    class JSONError(Exception):
+        pass
+
+    def __init__(self, fail_after=None):
+        self._fail_after = fail_after
+
+    def items(self, stream, prefix):
+        assert prefix == "results.item"
+        if self._fail_after is not None:
+            stream.read(self._fail_after)
+            raise self.JSONError("bad json")
+        yield from orjson.loads(stream.read())["results"]
+
+
+_SEMGREP_RESULT = {
+    "path": "a.py",
+    "check_id": "rule.x",
+    "start": {"line": 3, "col": 5},
+    "extra": {"severity": "ERROR", "message": "m", "lines": "x = 1"},
+}
+
+
+def test_semgrep_streams_results_through_ijson(monkeypatch, tmp_path):
+    payload = orjson.dumps({"results": [_SEMGREP_RESULT] * 2}).decode()
+    _fake_command(monkeypatch, tmp_path, "semgrep", f"import sys\nsys.stdout.write({payload!r})\n")
+    monkeypatch.setattr(scanners, "ijson", _FakeIjson())
+    issues = scanners.SemgrepScanner().run(str(tmp_path))
+    assert [(i.file, i.line, i.column, i.severity, i.rule_id) for i in issues] == [("a.py", 3, 5, "error", "rule.x")] * 2
+
+
+def test_semgrep_parse_error_drains_remaining_output(monkeypatch, tmp_path):
+    # 解析失败后仍有远超管道缓冲区的输出，未读空时子进程会阻塞在写入上
+    _fake_command(monkeypatch, tmp_path, "semgrep", "import sys\nsys.stdout.write('{oops' + 'x' * (1 << 20))\n")
+    monkeypatch.setattr(scanners, "ijson", _FakeIjson(fail_after=5))
+    with pytest.raises(RuntimeError, match="semgrep 输出解析失败"):
+        scanners.SemgrepScanner().run(str(tmp_path))
+
+
+def test_bandit_parses_raw_stdout_bytes(monkeypatch, tmp_path):
+    import subprocess
+
+    report = {"results": [{"filename": "a.py", "line_number": 7, "issue_severity": "HIGH", "test_id": "B101", "issue_text": "断言"}]}
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(kwargs)
+        return subprocess.CompletedProcess(cmd, 0, stdout=orjson.dumps(report), stderr=b"")
+
+    monkeypatch.setattr(scanners.subprocess, "run", fake_run)
+    issues = scanners.BanditScanner().run(str(tmp_path))
+    assert "text" not in calls[0]
+    assert [(i.file, i.line, i.severity, i.rule_id, i.message) for i in issues] == [("a.py", 7, "high", "B101", "断言")]
+
+
+def test_scanner_error_output_decodes_only_the_head():
+    import subprocess
+
+    exc = subprocess.CalledProcessError(1, ["bandit"], output=b"", stderr="错误".encode("utf-8") + b"x" * 10000)
+    message = scanners._error_output(exc)
+    assert message.startswith("错误") and len(message) < 4096
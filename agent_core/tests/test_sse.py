@@ -0,0 +1,25 @@
+from agent_core.providers.sse import SseLineBuffer, decode_sse_line, iter_sse_lines
+
+
+def test_iter_sse_lines_splits_across_chunks():
+    chunks = [b"data: a", b"bc\r\n\r\ndata: de", b"f\ndata: tail"]
+    lines = [bytes(line) for line in iter_sse_lines(chunks, capacity=8)]
+    assert lines == [b"data: abc", b"", b"data: def", b"data: tail"]
+
+
+def test_sse_line_buffer_compacts_and_grows():
+    buf = SseLineBuffer(capacity=8)
+    assert [bytes(x) for x in buf.feed(b"123456\n")] == [b"123456"]
+    assert list(buf.feed(b"ab")) == []
+    # 容量足够时压缩到头部，超出时翻倍扩容并保留未完成的行
+    assert [bytes(x) for x in buf.feed(b"cdef\n")] == [b"abcdef"]
+    long_line = b"x" * 40
+    assert [bytes(x) for x in buf.feed(long_line + b"\nrest")] == [long_line]
+    assert [bytes(x) for x in buf.flush()] == [b"rest"]
+
+
+def test_decode_sse_line_classifies_by_prefix():
+    assert decode_sse_line(memoryview(b'data: {"a": 1}')) == {"a": 1}
+    assert decode_sse_line(memoryview(b'data:{"a": 2}')) == {"a": 2}
+    for line in (b"", b": keep-alive", b"event: message", b"data: [DONE]", b"data:", b"data: {broken"):
+        assert decode_sse_line(memoryview(line)) is None
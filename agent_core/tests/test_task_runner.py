@@ -0,0 +1,318 @@
+import json
+
+import pytest
+
+import agent_core.tasks.task_runner as task_runner
+from agent_core.domain.models import ChatChoice, ChatMessage, ChatResult
+from agent_core.tasks.config import TaskConfig
+from agent_core.tools.definitions import ToolCall
+
+
+@pytest.fixture(autouse=True)
+def _isolated_registry(monkeypatch):
+    monkeypatch.setattr(task_runner, "_PROVIDER_CACHE", {})
+    monkeypatch.setattr(task_runner, "_FILE_PROVIDER_CACHE", {})
+
+
+class FakeProvider:
+    """按顺序返回预设的 assistant 消息，并记录每次收到的请求。"""
+
+    def __init__(self, replies):
+        self._replies = list(replies)
+        self.requests = []
+
+    def chat(self, req):
+        self.requests.append(req)
+        message = self._replies.pop(0)
+        return ChatResult(provider="fake", model=req.model, choices=[ChatChoice(index=0, message=message)])
+
+
+def _make_project(root):
+    (root / "a.py").write_text("print('a')\n", encoding="utf-8")
+    (root / "b.py").write_text("print('b')\n", encoding="utf-8")
+
+
+def test_run_agent_executes_tool_calls_in_order(monkeypatch, tmp_path):
+    _make_project(tmp_path)
+    provider = FakeProvider(
+        [
+            ChatMessage(
+                role="assistant",
+                content="",
+                tool_calls=[
+                    ToolCall(id="c1", name="read_file", arguments={"path": "a.py"}),
+                    ToolCall(id="c2", name="read_file", arguments={"path": "b.py"}),
+                    ToolCall(id="c3", name="no_such_tool", arguments={}),
+                ],
+            ),
+            ChatMessage(role="assistant", content="done"),
+        ]
+    )
+    monkeypatch.setattr(task_runner, "create_provider", lambda name: provider)
+    config = TaskConfig(mode="read_only", max_steps=3, project_root=str(tmp_path))
+
+    assert task_runner.run_agent("review", config, provider_name="fake") == "done"
+
+    tool_messages = [m for m in provider.requests[1].messages if m.role == "tool"]
+    assert [m.tool_call_id for m in tool_messages] == ["c1", "c2", "c3"]
+    assert tool_messages[0].content == "print('a')\n"
+    assert tool_messages[1].content == "print('b')\n"
+    assert json.loads(tool_messages[2].content)["error"] == "UNKNOWN_TOOL"
+
+    trace = json.loads((tmp_path / "traces" / f"{config.trace_id}.json").read_text(encoding="utf-8"))
+    assert trace["final_status"] == "ok"
+    errors = {s["tool_name"]: s.get("error") for s in trace["steps"] if s["type"] == "tool"}
+    assert errors["no_such_tool"]["error"] == "UNKNOWN_TOOL"
+    assert errors["read_file"] is None
+    assert sorted(s.get("tool_name", "") for s in trace["steps"] if s["type"] == "tool") == [
+        "no_such_tool",
+        "read_file",
+        "read_file",
+    ]
+
+
+def test_write_batches_run_sequentially_outside_read_only(tmp_path):
+    calls = [
+        ToolCall(id="c1", name="read_file", arguments={"path": "a.py"}),
+        ToolCall(id="c2", name="write_file_safe", arguments={"path": "a.py", "new_content": "x"}),
+    ]
+    safe = TaskConfig(mode="safe_write", max_steps=1, project_root=str(tmp_path))
+    read_only = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path))
+    assert task_runner._has_effective_write(calls, safe)
+    assert not task_runner._has_effective_write(calls, read_only)
+    assert not task_runner._has_effective_write(calls[:1], safe)
+
+
+def test_run_agent_finalizes_trace_on_provider_error(monkeypatch, tmp_path):
+    class BrokenProvider:
+        def chat(self, req):
+            raise RuntimeError("provider down")
+
+    monkeypatch.setattr(task_runner, "create_provider", lambda name: BrokenProvider())
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        task_runner.run_agent("review", config, provider_name="fake")
+    trace = json.loads((tmp_path / "traces" / f"{config.trace_id}.json").read_text(encoding="utf-8"))
+    assert trace["final_status"] == "error"
+    assert trace["final_reply_preview"] == "provider down"
+
+
+def test_trace_recorder_appends_steps_to_sidecar(tmp_path):
+    from agent_core.tasks.trace import EagerTraceRecorder, TraceRecorder
+
+    config = TaskConfig(mode="read_only", max_steps=2, project_root=str(tmp_path))
+    trace = TraceRecorder.for_config(config)
+    assert isinstance(trace, EagerTraceRecorder)
+    header = json.loads(trace.path.read_text(encoding="utf-8"))
+    assert header["steps"] == [] and header["final_status"] is None
+
+    trace.record_llm_step(0, has_tool_calls=True, content="  plan  ")
+    trace.record_tool_step(0, tool_name="read_file", args={"path": "x" * 300}, result="ok")
+    trace._steps_fp.flush()
+    lines = [json.loads(line) for line in trace.steps_path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["type"] for entry in lines] == ["llm", "tool"]
+    assert lines[0]["response_summary"] == "plan"
+    assert lines[1]["args"]["path"] == "x" * 200 + "..."
+
+    trace.finalize("ok", "done")
+    final = json.loads(trace.path.read_text(encoding="utf-8"))
+    assert [entry["type"] for entry in final["steps"]] == ["llm", "tool"]
+    assert final["final_status"] == "ok"
+    assert not trace.steps_path.exists()
+
+
+def test_run_agent_reuses_read_only_tool_results(monkeypatch, tmp_path):
+    _make_project(tmp_path)
+    read_a = lambda call_id: ToolCall(id=call_id, name="read_file", arguments={"path": "a.py"})  # noqa: E731
+    provider = FakeProvider(
+        [
+            ChatMessage(role="assistant", content="", tool_calls=[read_a("c1")]),
+            ChatMessage(
+                role="assistant",
+                content="",
+                tool_calls=[
+                    ToolCall(
+                        id="w1", name="write_file_safe", arguments={"path": "a.py", "new_content": "changed\n"}
+                    )
+                ],
+            ),
+            ChatMessage(role="assistant", content="", tool_calls=[read_a("c2")]),
+            ChatMessage(role="assistant", content="", tool_calls=[read_a("c3")]),
+            ChatMessage(role="assistant", content="done"),
+        ]
+    )
+    monkeypatch.setattr(task_runner, "create_provider", lambda name: provider)
+    config = TaskConfig(mode="safe_write", max_steps=5, project_root=str(tmp_path))
+    task_runner.run_agent("review", config, provider_name="fake")
+
+    tool_messages = {m.tool_call_id: m.content for m in provider.requests[-1].messages if m.role == "tool"}
+    assert tool_messages["c1"] == "print('a')\n"
+    # 写入后缓存失效，再次读取拿到新内容，第三次命中缓存
+    assert tool_messages["c2"] == "changed\n"
+    assert tool_messages["c3"] == "changed\n"
+    trace = json.loads((tmp_path / "traces" / f"{config.trace_id}.json").read_text(encoding="utf-8"))
+    summaries = [s["result_summary"] for s in trace["steps"] if s.get("tool_name") == "read_file"]
+    assert [summary.rsplit(" ", 1)[-1] for summary in summaries] == [
+        "[cached-miss]",
+        "[cached-miss]",
+        "[cached-hit]",
+    ]
+
+
+def test_run_agent_reuses_provider_clients(monkeypatch, tmp_path):
+    created = []
+
+    def fake_create_provider(name):
+        provider = FakeProvider([ChatMessage(role="assistant", content="done")] * 2)
+        created.append(provider)
+        return provider
+
+    monkeypatch.setattr(task_runner, "create_provider", fake_create_provider)
+    for _ in range(2):
+        config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path))
+        assert task_runner.run_agent("review", config, provider_name="fake") == "done"
+    assert len(created) == 1
+    assert len(task_runner._FILE_PROVIDER_CACHE) == 1
+
+
+def test_summary_matches_strip_then_truncate():
+    from agent_core.tasks.trace import _summary
+
+    samples = [
+        "",
+        "short",
+        "  padded \n",
+        "x" * 200,
+        "   " + "y" * 200,
+        "z" * 150 + " " * 30,
+        " " * 100 + "w" * 100,
+        "line\n" * 1000,
+        "v" * 100 + " " * 1000,
+    ]
+    for text in samples:
+        stripped = text.strip()
+        expected = stripped if len(stripped) <= 160 else stripped[:160] + "..."
+        assert _summary(text) == expected
+
+
+def test_trace_mode_on_error_writes_only_failed_runs(monkeypatch, tmp_path):
+    provider = FakeProvider([ChatMessage(role="assistant", content="done")])
+    monkeypatch.setattr(task_runner, "create_provider", lambda name: provider)
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path), trace_mode="on_error")
+    assert task_runner.run_agent("review", config, provider_name="fake") == "done"
+    assert not (tmp_path / "traces").exists()
+
+    looping = ChatMessage(
+        role="assistant", content="", tool_calls=[ToolCall(id="c1", name="list_project_files", arguments={})]
+    )
+    monkeypatch.setattr(task_runner, "_PROVIDER_CACHE", {"fake": FakeProvider([looping])})
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path), trace_mode="on_error")
+    task_runner.run_agent("review", config, provider_name="fake")
+    trace = json.loads((tmp_path / "traces" / f"{config.trace_id}.json").read_text(encoding="utf-8"))
+    assert trace["final_status"] == "max_steps_exceeded"
+    assert [entry["type"] for entry in trace["steps"]] == ["llm", "tool"]
+
+
+def test_trace_mode_off_writes_nothing(monkeypatch, tmp_path):
+    provider = FakeProvider([ChatMessage(role="assistant", content="done")])
+    monkeypatch.setattr(task_runner, "create_provider", lambda name: provider)
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path), trace_mode="off")
+    assert task_runner.run_agent("review", config, provider_name="fake") == "done"
+    assert not (tmp_path / "traces").exists()
+
+
+def test_trace_trimmers_follow_tool_schema():
+    from agent_core.tasks.trace import _TRIMMERS, _trim_args
+
+    long_text = "x" * 300
+    args = {"path": "a.py", "new_content": long_text}
+    trimmed = _TRIMMERS["write_file_safe"](args)
+    assert trimmed == {"path": "a.py", "new_content": "x" * 200 + "..."}
+    assert args["new_content"] == long_text
+    small = {"query": "todo", "max_results": 5}
+    assert _TRIMMERS["search_in_files"](small) is small
+    # schema 之外的参数退回通用裁剪
+    extra = {"query": "todo", "note": long_text}
+    assert _TRIMMERS["search_in_files"](extra) == _trim_args(extra)
+    # 声明为非 string 的参数收到超长字符串时同样裁剪
+    mistyped = {"query": "todo", "max_results": long_text}
+    assert _TRIMMERS["search_in_files"](mistyped) == {"query": "todo", "max_results": "x" * 200 + "..."}
+
+
+def test_run_agent_batch_keeps_input_order(monkeypatch, tmp_path):
+    class EchoProvider:
+        def chat(self, req):
+            text = req.messages[1].content
+            message = ChatMessage(role="assistant", content=f"done:{text}")
+            return ChatResult(provider="fake", model=req.model, choices=[ChatChoice(index=0, message=message)])
+
+    monkeypatch.setattr(task_runner, "create_provider", lambda name: EchoProvider())
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path), trace_id="batch")
+    results = task_runner.run_agent_batch(["a", "b", "c"], config, provider_name="fake", max_concurrency=2)
+    assert results == ["done:a", "done:b", "done:c"]
+    assert sorted(p.name for p in (tmp_path / "traces").glob("*.json")) == [
+        "batch-0.json",
+        "batch-1.json",
+        "batch-2.json",
+    ]
+    assert config.trace_id == "batch"
+
+
+def test_structured_tool_results_are_serialized_by_dispatcher(tmp_path):
+    from agent_core.tasks.file_provider import LocalFileToolProvider
+    from agent_core.tasks.trace import NoopTraceRecorder
+
+    _make_project(tmp_path)
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path))
+    call = ToolCall(id="c1", name="list_project_files", arguments={"pattern": "*.py"})
+    content = task_runner._execute_tool_call(
+        call, config, LocalFileToolProvider(tmp_path), NoopTraceRecorder(), 0, task_runner._ToolResultCache()
+    )
+    assert sorted(json.loads(content)["files"]) == ["a.py", "b.py"]
+
+
+def test_prewarm_marks_speculative_hits(tmp_path):
+    from agent_core.tasks.file_provider import LocalFileToolProvider
+    from agent_core.tasks.trace import DeferredTraceRecorder
+
+    (tmp_path / "README.md").write_text("# demo\n", encoding="utf-8")
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path))
+    provider = LocalFileToolProvider(tmp_path)
+    cache = task_runner._ToolResultCache()
+    task_runner._prewarm(provider, config, cache)
+
+    trace = DeferredTraceRecorder(config)
+    call = ToolCall(id="c1", name="read_file", arguments={"path": "README.md"})
+    for _ in range(2):
+        assert task_runner._execute_tool_call(call, config, provider, trace, 0, cache) == "# demo\n"
+    summaries = [entry.result_summary for entry in trace.data["steps"]]
+    assert summaries == ["# demo [speculative-hit]", "# demo [cached-hit]"]
+
+    # 清空后开始前的预读结果不会再写回
+    stale_generation = cache.generation
+    cache.clear()
+    cache.put_speculative(cache.key("read_file", {"path": "README.md"}), "old", stale_generation)
+    assert cache.get(cache.key("read_file", {"path": "README.md"})) is None
+
+
+def test_run_agent_creates_no_trace_when_provider_cannot_be_created(monkeypatch, tmp_path):
+    import threading
+
+    def broken_factory(name):
+        raise RuntimeError("no such provider")
+
+    monkeypatch.setattr(task_runner, "create_provider", broken_factory)
+    flush_threads = lambda: [t for t in threading.enumerate() if t.name == "trace-flush"]  # noqa: E731
+    before = len(flush_threads())
+    config = TaskConfig(mode="read_only", max_steps=1, project_root=str(tmp_path))
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            task_runner.run_agent("review", config, provider_name="missing")
+    assert len(flush_threads()) == before
+    assert not (tmp_path / "traces").exists() or not any((tmp_path / "traces").iterdir())
+
+
+@pytest.mark.parametrize("value, expected", [(3, 3), (0, 8), ("abc", 8), (None, 8)])
+def test_tool_concurrency_limit_falls_back_on_invalid_setting(monkeypatch, value, expected):
+    monkeypatch.setattr(task_runner.settings, "tool_concurrency_limit", value, raising=False)
+    assert task_runner._tool_concurrency_limit() == expected
@@ -18,3 +18,268 @@ def test_tools_basic_read_list_search_propose():
         assert "world" in sc.content
         pc = te.execute(ToolCall(id="4", name="propose_edit", arguments={"path": str(f), "range": [2, 2], "new_content": "planet"}))
         assert "@@ -2,1 +2,1" in pc.content
+
+
+def test_list_and_search_walk_nested_directories(tmp_path):
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / "sub" / "deep.py").write_text("needle = 1\n", encoding="utf-8")
+    (tmp_path / "top.py").write_text("print('hi')\n", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("needle\n", encoding="utf-8")
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    listed = te.execute(ToolCall(id="1", name="list_files", arguments={"pattern": "*.py"})).content
+    assert sorted(listed.splitlines()) == [str(Path("pkg", "sub", "deep.py")), "top.py"]
+
+    found = te.execute(ToolCall(id="2", name="search_code", arguments={"query": "needle"})).content
+    assert sorted(found.splitlines()) == ["notes.md:1: needle", f"{Path('pkg', 'sub', 'deep.py')}:1: needle = 1"]
+
+
+def test_list_files_pattern_shortcuts_match_fnmatch(tmp_path):
+    for name in ("a.py", "b.txt", "Makefile", "c.pyc"):
+        (tmp_path / name).write_text("x", encoding="utf-8")
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    def listed(pattern):
+        content = te.execute(ToolCall(id=pattern, name="list_files", arguments={"pattern": pattern})).content
+        return sorted(content.splitlines())
+
+    assert listed("*") == ["Makefile", "a.py", "b.txt", "c.pyc"]
+    assert listed("*.py") == ["a.py"]
+    assert listed("Makefile") == ["Makefile"]
+    assert listed("?.py*") == ["a.py", "c.pyc"]
+
+
+def test_search_code_skips_binary_and_decodes_matches(tmp_path):
+    (tmp_path / "blob.bin").write_bytes(b"\x00\x01needle")
+    (tmp_path / "zh.py").write_text("# 中文 needle\nother\n", encoding="utf-8")
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    found = te.execute(ToolCall(id="1", name="search_code", arguments={"query": "needle"})).content
+    assert found == "zh.py:1: # 中文 needle"
+    found = te.execute(ToolCall(id="2", name="search_code", arguments={"query": "中文"})).content
+    assert found == "zh.py:1: # 中文 needle"
+
+
+def test_read_file_matches_read_text(tmp_path, monkeypatch):
+    from agent_core.tools import executor
+
+    small = tmp_path / "small.txt"
+    small.write_bytes("行一\r\n行二\rend\n".encode("utf-8"))
+    large = tmp_path / "large.txt"
+    large.write_bytes(b"0123456789abcdef\n" * 4096)
+    monkeypatch.setattr(executor, "_SINGLE_READ_MAX", 1024)
+    monkeypatch.setattr(executor, "_READ_CHUNK", 1000)
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    for path in (small, large):
+        content = te.execute(ToolCall(id=path.name, name="read_file", arguments={"path": path.name})).content
+        assert content == path.read_text(encoding="utf-8")
+    (tmp_path / "gbk.txt").write_bytes("中文".encode("gbk"))
+    assert te.execute(ToolCall(id="gbk", name="read_file", arguments={"path": "gbk.txt"})).content == "\ufffd" * 4
+    args = {"path": "gbk.txt", "encoding": "gbk"}
+    assert te.execute(ToolCall(id="gbk2", name="read_file", arguments=args)).content == "中文"
+    args = {"path": "gbk.txt", "encoding": "no-such-codec"}
+    assert "no-such-codec" in te.execute(ToolCall(id="bad", name="read_file", arguments=args)).content
+
+
+def test_search_code_skips_ignored_dirs_binaries_and_large_files(tmp_path, monkeypatch):
+    from agent_core.tools import executor
+
+    for rel in (".git/config", "node_modules/lib.js", "logo.PNG", "big.txt", "src/ok.py"):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("needle\n", encoding="utf-8")
+    (tmp_path / "big.txt").write_text("needle\n" * 100, encoding="utf-8")
+    monkeypatch.setattr(executor, "MAX_SEARCH_FILE_BYTES", 100)
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    found = te.execute(ToolCall(id="1", name="search_code", arguments={"query": "needle"})).content
+    assert found == f"{Path('src', 'ok.py')}:1: needle"
+    # list_files 同样剪枝忽略目录，但不按扩展名和大小过滤
+    listed = te.execute(ToolCall(id="2", name="list_files", arguments={})).content
+    assert sorted(listed.splitlines()) == ["big.txt", "logo.PNG", str(Path("src", "ok.py"))]
+
+
+def test_format_relative_slices_root_prefix(tmp_path):
+    from agent_core.tools.executor import _format_relative
+
+    root = tmp_path.resolve()
+    assert _format_relative(str(root / "pkg" / "a.py"), root) == str(Path("pkg", "a.py"))
+    assert _format_relative(root, root) == "."
+    outside = str(root.parent / (root.name + "-other") / "a.py")
+    assert _format_relative(outside, root) == outside
+    assert _format_relative(outside, None) == outside
+
+
+def test_search_code_batches_keep_walk_order_and_limit(tmp_path, monkeypatch):
+    from agent_core.tools import executor
+    from agent_core.tools.filesystem import iter_files
+
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text(f"needle {i}a\nskip\nneedle {i}b\n", encoding="utf-8")
+    monkeypatch.setattr(executor, "_SEARCH_BATCH", 2)
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    walk_order = [entry.name for entry in iter_files(str(tmp_path.resolve()))]
+    expected = [f"{name}:{n}: needle {name[1]}{suffix}" for name in walk_order for n, suffix in ((1, "a"), (3, "b"))]
+    found = te.execute(ToolCall(id="1", name="search_code", arguments={"query": "needle", "max_results": 7})).content
+    assert found.splitlines() == expected[:7]
+
+
+def test_tool_executor_cache_is_bounded_lru():
+    calls = []
+
+    def echo(args):
+        calls.append(args)
+        return repr(sorted(args.items()))
+
+    te = ToolExecutor({"echo": echo}, cache_size=2)
+    a = ToolCall(id="a", name="echo", arguments={"x": 1})
+    b = ToolCall(id="b", name="echo", arguments={"x": [1, 2]})
+    c = ToolCall(id="c", name="echo", arguments={"x": 3})
+    te.execute(a)
+    te.execute(b)
+    te.execute(a)  # 命中，a 变为最近使用
+    te.execute(c)  # 淘汰 b
+    te.execute(a)
+    te.execute(ToolCall(id="b2", name="echo", arguments={"x": [1, 2]}))
+    assert calls == [{"x": 1}, {"x": [1, 2]}, {"x": 3}, {"x": [1, 2]}]
+    assert te.execute(ToolCall(id="z", name="missing", arguments={})).content == "Tool not registered"
+
+
+def test_propose_edit_diff_body(tmp_path):
+    (tmp_path / "m.py").write_bytes(b"one\r\ntwo\r\n\r\nfour\r\n")
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+
+    def propose(rng, new_content):
+        args = {"path": "m.py", "range": rng, "new_content": new_content}
+        return te.execute(ToolCall(id=str(rng), name="propose_edit", arguments=args)).content
+
+    assert propose([2, 3], "TWO\nTHREE\nextra") == "\n".join(
+        ["--- a/m.py", "+++ b/m.py", "@@ -2,2 +2,3", "-two", "-", "+TWO", "+THREE", "+extra"]
+    )
+    assert propose([5, 5], "tail").endswith("@@ -5,1 +5,1\n+tail")
+    assert propose([6, 6], "x") == "range out of bounds"
+
+
+def test_tool_executor_cache_key_ignores_argument_order():
+    calls = []
+    te = ToolExecutor({"echo": lambda args: calls.append(args) or "ok"})
+    te.execute(ToolCall(id="1", name="echo", arguments={"range": [1, 2], "opts": {"a": 1, "b": 2}}))
+    te.execute(ToolCall(id="2", name="echo", arguments={"opts": {"b": 2, "a": 1}, "range": [1, 2]}))
+    te.execute(ToolCall(id="3", name="echo", arguments={"range": [2, 1], "opts": {"a": 1, "b": 2}}))
+    te.execute(ToolCall(id="4", name="echo", arguments={"tags": {"x"}}))
+    te.execute(ToolCall(id="5", name="echo", arguments={"tags": {"x"}}))
+    assert len(calls) == 3
+
+
+def test_search_code_mmap_path_matches_small_file_path(tmp_path, monkeypatch):
+    from agent_core.tools import executor
+
+    text = "alpha\r\nneedle one\n\nbeta needle two\nno match"
+    (tmp_path / "a.txt").write_text(text, encoding="utf-8", newline="")
+    te = ToolExecutor(default_tools(workspace_root=tmp_path))
+    args = {"query": "needle"}
+    small = te.execute(ToolCall(id="1", name="search_code", arguments=args)).content
+
+    monkeypatch.setattr(executor, "_MMAP_MIN_BYTES", 0)
+    large = ToolExecutor(default_tools(workspace_root=tmp_path)).execute(ToolCall(id="2", name="search_code", arguments=args)).content
+    assert small == large == "a.txt:2: needle one\na.txt:4: beta needle two"
+
+
+def test_file_cache_shared_and_invalidated_by_stat(tmp_path, monkeypatch):
+    import os
+
+    from agent_core.tools import executor
+
+    monkeypatch.setattr(executor, "_FILE_CACHE", executor.OrderedDict())
+    monkeypatch.setattr(executor, "_file_cache_bytes", 0)
+    reads = []
+    real_read = executor._read_bytes
+    monkeypatch.setattr(executor, "_read_bytes", lambda path, size: reads.append(path) or real_read(path, size))
+    target = tmp_path / "a.py"
+    target.write_text("needle = 1\n", encoding="utf-8")
+    tools = default_tools(workspace_root=tmp_path)
+
+    assert tools["read_file"]({"path": "a.py"}) == "needle = 1\n"
+    assert tools["search_code"]({"query": "needle"}) == "a.py:1: needle = 1"
+    assert len(reads) == 1
+
+    target.write_text("needle = 22\n", encoding="utf-8")
+    os.utime(target, ns=(1, 1))
+    assert tools["read_file"]({"path": "a.py"}) == "needle = 22\n"
+    assert len(reads) == 2
+
+    monkeypatch.setattr(executor, "_FILE_CACHE_MAX_BYTES", 15)
+    (tmp_path / "b.py").write_text("needle = 3\n", encoding="utf-8")
+    tools["read_file"]({"path": "b.py"})
+    assert [key[0] for key in executor._FILE_CACHE] == [str((tmp_path / "b.py").resolve())]
+
+
+def test_matching_lines_counts_lines_between_hits(monkeypatch):
+    import mmap
+
+    from agent_core.tools import executor
+    from agent_core.tools.executor import _matching_lines
+
+    # 分块小于行间距，覆盖 mmap 跨块计数换行
+    monkeypatch.setattr(executor, "_COUNT_CHUNK_BYTES", 3)
+
+    data = b"needle needle\n\nx\n  needle at 4\r\nlast needle"
+    expected = [(1, "needle needle"), (4, "needle at 4"), (5, "last needle")]
+    assert _matching_lines(data, b"needle", data.find(b"needle")) == expected
+    with mmap.mmap(-1, len(data)) as mm:
+        mm.write(data)
+        assert _matching_lines(mm, b"needle", 0) == expected
+    assert _matching_lines(b"x\n\nneedle", b"needle", 3) == [(3, "needle")]
+    assert _matching_lines(b"a\nb", b"a\nb", 0) == []
+
+
+def test_paths_outside_root_are_rejected(tmp_path):
+    root = tmp_path / "ws"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "a.py").write_text("x\n", encoding="utf-8")
+    sibling = tmp_path / "ws-other"
+    sibling.mkdir()
+    (sibling / "secret.txt").write_text("s\n", encoding="utf-8")
+    tools = default_tools(workspace_root=root)
+
+    assert tools["read_file"]({"path": "pkg/a.py"}) == "x\n"
+    assert tools["read_file"]({"path": str(root / "pkg" / "a.py")}) == "x\n"
+    assert tools["read_file"]({"path": "../ws-other/secret.txt"}) == "invalid path"
+    assert tools["read_file"]({"path": str(sibling / "secret.txt")}) == "invalid path"
+    assert tools["list_files"]({"directory": "."}) == str(Path("pkg", "a.py"))
+
+
+def test_read_file_rejects_directories_and_missing_files(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    tools = default_tools(workspace_root=tmp_path)
+    assert tools["read_file"]({"path": "pkg"}) == "invalid path"
+    assert tools["read_file"]({"path": "missing.txt"}) == "invalid path"
+
+
+def test_unscoped_tools_accept_absolute_paths(tmp_path, monkeypatch):
+    from agent_core.tools import executor
+
+    monkeypatch.setattr(executor.settings, "workspace_root", None, raising=False)
+    (tmp_path / "pkg").mkdir()
+    target = tmp_path / "pkg" / "a.py"
+    target.write_text("needle\n", encoding="utf-8")
+    tools = default_tools(allow_absolute=True)
+
+    assert tools["read_file"]({"path": str(target)}) == "needle\n"
+    resolved = str(target.resolve())
+    assert tools["list_files"]({"directory": str(tmp_path)}) == resolved
+    assert tools["search_code"]({"directory": str(tmp_path), "query": "needle"}) == f"{resolved}:1: needle"
+
+
+def test_make_tool_call_seeds_raw_json_only_when_parsed():
+    from agent_core.tools.definitions import make_tool_call
+
+    raw = '{"path":  "a.py"}'
+    call = make_tool_call("t1", "read_file", raw, {"path": "a.py"})
+    assert call.arguments_json() is raw
+
+    bad = "{oops"
+    broken = make_tool_call("t2", "read_file", bad, {"_raw": bad})
+    assert broken.arguments_json() == '{"_raw":"{oops"}'
@@ -3,4 +3,5 @@
 包含：
 - definitions: ToolDef / ToolCall / ToolResult 等数据结构。
 - executor: ToolExecutor 及默认的 read_file/list_files/search_code/propose_edit 工具实现。
+- filesystem: 文件工具共用的目录遍历与文件名匹配（tasks.file_provider 同样使用）。
 """
@@ -5,8 +5,11 @@
 - 在 AgentEngine 中保存和执行模型触发的工具调用（ToolCall / ToolResult）。
 """
 
-from dataclasses import dataclass
-from typing import Dict, Any
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple
+
+import orjson
 
 
 @dataclass
@@ -27,6 +30,31 @@ class ToolDef:
     description: str
     params: Dict[str, ToolParam]
 
+    def to_openai_schema(self) -> Dict[str, Any]:
+        """转成 OpenAI 兼容的 function tool 描述（Kimi/GLM 共用此格式）。"""
+
+        properties: Dict[str, Any] = {}
+        required = []
+        for name, param in self.params.items():
+            schema = param.schema or {"type": "string"}
+            if param.description:
+                schema = {**schema, "description": param.description}
+            properties[name] = schema
+            if param.required:
+                required.append(name)
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required,
+                },
+            },
+        }
+
 
 @dataclass
 class ToolCall:
@@ -35,6 +63,46 @@ class ToolCall:
     id: str
     name: str
     arguments: Dict[str, Any]
+    # (arguments 对象, 序列化结果) 缓存；arguments 被整体替换时自动失效
+    _arguments_json: Optional[Tuple[Dict[str, Any], str]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def seed_arguments_json(self, raw: str) -> None:
+        """用已知与 arguments 等价的 JSON 字符串（如模型原始返回）预填缓存。"""
+
+        self._arguments_json = (self.arguments, raw)
+
+    def arguments_json(self) -> str:
+        """返回 arguments 的 JSON 字符串，首次序列化后缓存复用。
+
+        多轮工具循环每次请求都会重发历史 tool_calls，缓存后每个调用只序列化一次。
+        arguments 在调用生成后视为只读。
+        """
+
+        cached = self._arguments_json
+        if cached is not None and cached[0] is self.arguments:
+            return cached[1]
+        try:
+            text = orjson.dumps(self.arguments).decode()
+        except TypeError:
+            # orjson 不支持的类型（如非字符串 key）退回标准库
+            text = json.dumps(self.arguments, ensure_ascii=False)
+        self._arguments_json = (self.arguments, text)
+        return text
+
+
+def make_tool_call(call_id: str, name: str, raw_arguments: Any, arguments: Dict[str, Any]) -> ToolCall:
+    """构造 ToolCall；arguments 由 raw_arguments 解析成功时把原始 JSON 字符串作为序列化缓存。
+
+    这样回传历史工具调用时直接原样发送模型给出的字符串，不必再序列化一次。
+    解析失败（arguments 为 {"_raw": raw_arguments}）时不预填，按常规序列化。
+    """
+
+    call = ToolCall(id=call_id, name=name, arguments=arguments)
+    if isinstance(raw_arguments, str) and isinstance(arguments, dict) and arguments.get("_raw") is not raw_arguments:
+        call.seed_arguments_json(raw_arguments)
+    return call
 
 
 @dataclass
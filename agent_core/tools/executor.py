@@ -1,26 +1,66 @@
-from typing import Callable, Dict, Any, List, Optional, Union
+from typing import Callable, Dict, Any, Hashable, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
-import fnmatch
 import json
+import mmap
+import os
+import stat
+import threading
 
 from agent_core.config.settings import settings
 from .definitions import ToolCall, ToolResult, ToolDef, ToolParam
+from .filesystem import (
+    CASE_INSENSITIVE,
+    MAX_SEARCH_FILE_BYTES,
+    compile_name_pattern,
+    is_binary_name,
+    iter_files,
+    looks_binary,
+)
 
 
 ToolFunc = Callable[[Dict[str, Any]], str]
 MAX_LIST_RESULTS = 500
+# ToolExecutor 结果缓存的最大条目数，超出后淘汰最久未使用的条目
+TOOL_CACHE_SIZE = 512
 MAX_SEARCH_RESULTS = 200
+# 超过该大小的文件用 mmap 查找
+_MMAP_MIN_BYTES = 512 * 1024
+# mmap 上统计换行时每次切片的最大字节数
+_COUNT_CHUNK_BYTES = 256 * 1024
+# search_code 并行读取与查找的文件批大小，限制同时在内存中的文件内容
+_SEARCH_BATCH = 512
+# 读文件和 bytes 查找都会释放 GIL，I/O 等待可以在线程间重叠
+_SEARCH_POOL = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 4),
+    thread_name_prefix="search-code",
+)
+# Windows 上 os.open 默认是文本模式，需显式指定二进制
+_O_BINARY = getattr(os, "O_BINARY", 0)
+# 不超过该大小的文件按 fstat 得到的大小一次读完，更大的文件分块读取
+_SINGLE_READ_MAX = 4 << 20
+_READ_CHUNK = 128 << 10
+# 文件内容缓存：键为 (路径, mtime_ns, size)，文件被修改后自然失效；按总字节数淘汰
+_FILE_CACHE: "OrderedDict[Tuple[str, int, int], bytes]" = OrderedDict()
+_FILE_CACHE_MAX_BYTES = 64 << 20
+_file_cache_bytes = 0
+_FILE_CACHE_LOCK = threading.Lock()
 
 
 class ToolExecutor:
-    def __init__(self, tools: Dict[str, ToolFunc]):
+    def __init__(self, tools: Dict[str, ToolFunc], cache_size: int = TOOL_CACHE_SIZE):
         self._tools = tools
-        self._cache: Dict[tuple, str] = {}
+        self._cache: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._cache_size = cache_size
 
     def execute(self, call: ToolCall) -> ToolResult:
-        key = (call.name, json.dumps(call.arguments, sort_keys=True, ensure_ascii=False))
-        if key in self._cache:
-            result = self._cache[key]
+        key = _cache_key(call)
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
         else:
             func = self._tools.get(call.name)
             if not func:
@@ -28,9 +68,30 @@ class ToolExecutor:
             else:
                 result = func(call.arguments)
             self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
         return ToolResult(call_id=call.id, content=result)
 
 
+def _freeze(value: Any) -> Hashable:
+    # dict 转 frozenset（与键顺序无关，无需排序），list 转 tuple
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _cache_key(call: ToolCall) -> Hashable:
+    # 参数来自 JSON，几乎总能冻结成可哈希结构；遇到其它不可哈希值时才退回 JSON 文本
+    try:
+        key = (call.name, _freeze(call.arguments))
+        hash(key)
+    except TypeError:
+        return (call.name, json.dumps(call.arguments, sort_keys=True, ensure_ascii=False, default=repr))
+    return key
+
+
 def _coerce_root(root: Optional[Union[str, Path]]) -> Optional[Path]:
     if root is None:
         raw_root = getattr(settings, "workspace_root", None)
@@ -65,29 +126,199 @@ def _resolve_path(raw: str, root: Optional[Path], allow_absolute: bool) -> Optio
 
 
 def _is_within_root(path: Path, root: Path) -> bool:
-    try:
-        path.resolve().relative_to(root.resolve())
-        return True
-    except ValueError:
-        return False
+    # 调用方传入的 path 已 resolve，root 由 _coerce_root resolve 过，直接比较字符串前缀
+    text = str(path)
+    root_text = str(root)
+    prefix = _root_prefix(root)
+    if CASE_INSENSITIVE:
+        text, root_text, prefix = text.lower(), root_text.lower(), prefix.lower()
+    return text == root_text or text.startswith(prefix)
+
+
+@lru_cache(maxsize=64)
+def _root_prefix(root: Path) -> str:
+    text = str(root)
+    return text if text.endswith(os.sep) else text + os.sep
 
 
-def _format_relative(path: Path, root: Optional[Path]) -> str:
+def _format_relative(path: Union[str, Path], root: Optional[Path]) -> str:
+    # root 与传入的路径均已 resolve（遍历不跟随符号链接），直接按字符串前缀截取
+    text = str(path)
     if root:
+        prefix = _root_prefix(root)
+        if text.startswith(prefix):
+            return text[len(prefix):]
+        if text == str(root):
+            return "."
+    return text
+
+
+def _read_bytes(path: str, size: int) -> bytes:
+    # 直接基于文件描述符读取，省去 BufferedReader/TextIOWrapper 的构造以及 isatty/seek；
+    # size 来自调用方已有的 stat，不再 fstat，按该大小一次读完
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        if size <= _SINGLE_READ_MAX:
+            data = os.read(fd, size)
+            if len(data) == size:
+                return data
+            chunks = [data]
+        else:
+            chunks = []
+        while True:
+            chunk = os.read(fd, _READ_CHUNK)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def _cached_read(path: str, st: Optional[os.stat_result] = None) -> bytes:
+    # read_file/search_code/propose_edit 共用；只比较 stat 信息，不对内容做哈希
+    global _file_cache_bytes
+    if st is None:
+        st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _FILE_CACHE_LOCK:
+        data = _FILE_CACHE.get(key)
+        if data is not None:
+            _FILE_CACHE.move_to_end(key)
+            return data
+    data = _read_bytes(path, st.st_size)
+    if len(data) != st.st_size or len(data) > _FILE_CACHE_MAX_BYTES:
+        # 读取期间文件发生变化，或单个文件超出缓存容量
+        return data
+    with _FILE_CACHE_LOCK:
+        if key not in _FILE_CACHE:
+            _FILE_CACHE[key] = data
+            _file_cache_bytes += len(data)
+            while _file_cache_bytes > _FILE_CACHE_MAX_BYTES:
+                _, evicted = _FILE_CACHE.popitem(last=False)
+                _file_cache_bytes -= len(evicted)
+    return data
+
+
+def _decode_text(data: bytes, encoding: str = "utf-8", errors: str = "strict") -> str:
+    # 缓存与查找都基于 bytes，只在工具返回文本时解码
+    text = data.decode(encoding, errors)
+    if "\r" in text:
+        # 与 read_text 的通用换行一致
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _search_candidates(base: Path) -> Iterator[Tuple[str, os.stat_result]]:
+    # 每个文件只 stat 一次（DirEntry 会缓存结果），之后的大小判断与读取都复用它
+    for entry in iter_files(str(base)):
+        if is_binary_name(entry.name):
+            continue
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode) and st.st_size <= MAX_SEARCH_FILE_BYTES:
+            yield entry.path, st
+
+
+def _scan_file(path: str, st: os.stat_result, needle: bytes) -> List[Tuple[int, str]]:
+    try:
+        if st.st_size > _MMAP_MIN_BYTES:
+            # 大文件映射后查找：未命中时只按需换入页面，不复制到用户态缓冲区
+            with open(path, "rb", buffering=0) as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                first = mm.find(needle, 0)
+                if first < 0 or looks_binary(mm):
+                    return []
+                return _matching_lines(mm, needle, first)
+        data = _cached_read(path, st)
+    except (OSError, ValueError):
+        return []
+    # 先在字节层面整体查找，绝大多数不命中的文件无需解码和拆行
+    first = data.find(needle)
+    if first < 0 or looks_binary(data):
+        return []
+    return _matching_lines(data, needle, first)
+
+
+def _count_newlines(buf: Union[bytes, mmap.mmap], start: int, end: int) -> int:
+    if isinstance(buf, bytes):
+        return buf.count(b"\n", start, end)
+    # mmap 没有 count；按固定大小分块切片计数，拷贝有上限，计数仍在 C 层完成
+    n = 0
+    for lo in range(start, end, _COUNT_CHUNK_BYTES):
+        n += buf[lo:min(lo + _COUNT_CHUNK_BYTES, end)].count(b"\n")
+    return n
+
+
+def _matching_lines(buf: Union[bytes, mmap.mmap], needle: bytes, first: int) -> List[Tuple[int, str]]:
+    # 只在命中位置上工作：从调用方已找到的首个命中 first 开始，find 定位后续匹配，
+    # 统计其间的换行得到行号，Python 层循环次数与命中行数相同，而不是文件总行数
+    matches: List[Tuple[int, str]] = []
+    if b"\n" in needle:
+        # 按行匹配，跨行的查询不可能命中
+        return matches
+    size = len(buf)
+    line_no = 1
+    counted = 0
+    pos = first
+    while pos >= 0:
+        line_no += _count_newlines(buf, counted, pos)
+        # counted 之后第一个换行之前都属于已处理的行，向回查找不会越过它
+        start = buf.rfind(b"\n", counted, pos) + 1
+        end = buf.find(b"\n", pos)
+        if end < 0:
+            end = size
+        matches.append((line_no, buf[start:end].decode("utf-8", "replace").strip()))
+        # 同一行多次命中只记一次，从下一行继续查找
+        counted = end
+        pos = buf.find(needle, end + 1)
+    return matches
+
+
+def _iter_matches(base: Path, needle: bytes) -> Iterator[Tuple[str, int, str]]:
+    candidates = _search_candidates(base)
+    while True:
+        batch = list(islice(candidates, _SEARCH_BATCH))
+        if not batch:
+            return
+        futures = [_SEARCH_POOL.submit(_scan_file, path, st, needle) for path, st in batch]
         try:
-            return str(path.resolve().relative_to(root.resolve()))
-        except ValueError:
-            pass
-    return str(path)
+            # 按遍历顺序产出，保证结果与串行扫描一致
+            for (path, _), future in zip(batch, futures):
+                for line_no, line in future.result():
+                    yield path, line_no, line
+        finally:
+            # 调用方取够条数后关闭生成器时，取消本批尚未开始的扫描
+            for future in futures:
+                future.cancel()
+
+
+def _format_matches(matches: Iterator[Tuple[str, int, str]], root: Optional[Path]) -> Iterator[str]:
+    # 同一文件的命中是连续产出的，"显示路径:" 前缀每个文件只生成一次
+    last_path = None
+    prefix = ""
+    for path, line_no, line in matches:
+        if path is not last_path:
+            last_path = path
+            prefix = _format_relative(path, root) + ":"
+        yield f"{prefix}{line_no}: {line}"
 
 
 def _make_read_file_tool(root: Optional[Path], allow_absolute: bool) -> ToolFunc:
     def _run(args: Dict[str, Any]) -> str:
         path = _resolve_path(str(args.get("path") or ""), root, allow_absolute)
-        if not path or not path.exists() or not path.is_file():
+        if not path:
+            return "invalid path"
+        path_str = str(path)
+        try:
+            st = os.stat(path_str)
+        except OSError:
+            return "invalid path"
+        if not stat.S_ISREG(st.st_mode):
             return "invalid path"
+        encoding = str(args.get("encoding") or "utf-8")
         try:
-            return path.read_text(encoding="utf-8")
+            return _decode_text(_cached_read(path_str, st), encoding, "replace")
         except Exception as exc:
             return str(exc)
 
@@ -101,11 +332,12 @@ def _make_list_files_tool(root: Optional[Path], allow_absolute: bool) -> ToolFun
         base = _resolve_path(directory, root, allow_absolute) or root
         if base is None or not base.exists():
             return "invalid directory"
+        match = compile_name_pattern(pattern)
         items: List[str] = []
         try:
-            for path in base.rglob("*"):
-                if path.is_file() and fnmatch.fnmatch(path.name, pattern):
-                    items.append(_format_relative(path, root))
+            for entry in iter_files(str(base)):
+                if match(entry.name):
+                    items.append(_format_relative(entry.path, root))
                     if len(items) >= MAX_LIST_RESULTS:
                         items.append("... truncated ...")
                         break
@@ -131,24 +363,11 @@ def _make_search_code_tool(root: Optional[Path], allow_absolute: bool) -> ToolFu
         base = _resolve_path(directory, root, allow_absolute) or root
         if base is None or not base.exists():
             return "invalid directory"
-        results: List[str] = []
+        matches = islice(_iter_matches(base, query.encode("utf-8")), limit)
         try:
-            for path in base.rglob("*"):
-                if not path.is_file():
-                    continue
-                try:
-                    content = path.read_text(encoding="utf-8", errors="ignore")
-                except Exception:
-                    continue
-                for line_no, line in enumerate(content.splitlines(), start=1):
-                    if query in line:
-                        display = _format_relative(path, root)
-                        results.append(f"{display}:{line_no}: {line.strip()}")
-                        if len(results) >= limit:
-                            return "\n".join(results)
+            return "\n".join(_format_matches(matches, root))
         except Exception as exc:
             return str(exc)
-        return "\n".join(results)
 
     return _run
 
@@ -164,22 +383,27 @@ def _make_propose_edit_tool(root: Optional[Path], allow_absolute: bool) -> ToolF
             return "invalid range"
         start, end = int(rng[0]), int(rng[1])
         try:
-            original = path.read_text(encoding="utf-8")
+            original = _decode_text(_cached_read(str(path)))
         except Exception as exc:
             return str(exc)
-        lines = original.splitlines()
+        # 换行已统一为 \n，按 \n 切分即可；末尾换行不产生额外的空行
+        lines = original.split("\n")
+        if lines[-1] == "":
+            lines.pop()
         if start < 1 or end < start or end > len(lines) + 1:
             return "range out of bounds"
-        old_segment = "\n".join(lines[start - 1:end])
+        new_lines = new_content.splitlines()
         display_path = _format_relative(path, root)
-        header = [
+        header = (
             f"--- a/{display_path}",
             f"+++ b/{display_path}",
-            f"@@ -{start},{max(0, end - start + 1)} +{start},{len(new_content.splitlines())}",
-        ]
-        body: List[str] = [f"-{line}" for line in old_segment.splitlines()]
-        body.extend(f"+{line}" for line in new_content.splitlines())
-        return "\n".join(header + body)
+            f"@@ -{start},{max(0, end - start + 1)} +{start},{len(new_lines)}",
+        )
+        return "\n".join(chain(
+            header,
+            ["-" + line for line in lines[start - 1:end]],
+            ["+" + line for line in new_lines],
+        ))
 
     return _run
 
@@ -209,7 +433,13 @@ def default_tool_defs() -> List[ToolDef]:
                     description="相对项目根目录的文件路径",
                     required=True,
                     schema={"type": "string"},
-                )
+                ),
+                "encoding": ToolParam(
+                    name="encoding",
+                    description="文件编码，默认 utf-8；无法解码的字节以替换字符显示",
+                    required=False,
+                    schema={"type": "string"},
+                ),
             },
         ),
         ToolDef(
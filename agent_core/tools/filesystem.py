@@ -0,0 +1,82 @@
+"""文件工具共用的文件系统辅助函数。
+
+tools.executor 与 tasks.file_provider 两套文件工具（以及 scanners 的适用性检查）
+都依赖这里的实现，保证各处的目录遍历、文件名匹配与搜索过滤规则一致。
+"""
+
+import fnmatch
+import mmap
+import os
+import re
+from typing import Callable, FrozenSet, Iterator, Union
+
+# 遍历时不进入的目录；此外所有以 "." 开头的隐藏目录（.git 等）也会跳过
+SKIP_DIRS: FrozenSet[str] = frozenset({"node_modules", "__pycache__"})
+
+# 代码搜索跳过超过该大小的文件（多为数据或生成物）
+MAX_SEARCH_FILE_BYTES = 2 * 1024 * 1024
+
+# 代码搜索按扩展名直接跳过的二进制文件，不必读取内容
+BINARY_EXTS: FrozenSet[str] = frozenset({
+    "png", "jpg", "jpeg", "gif", "bmp", "ico", "webp", "pdf", "mp3", "mp4", "mov", "wav",
+    "zip", "gz", "tgz", "bz2", "xz", "7z", "rar", "jar", "whl", "egg",
+    "so", "o", "a", "dll", "dylib", "exe", "bin", "class", "pyc", "pyo", "pyd",
+    "woff", "woff2", "ttf", "otf", "eot", "sqlite", "db",
+})
+# 扩展名未知时，文件头这么多字节内出现 NUL 即视为二进制
+_BINARY_SNIFF_BYTES = 4096
+
+# 与 fnmatch.fnmatch 一致：在大小写不敏感的平台（Windows）上忽略大小写
+CASE_INSENSITIVE = os.path.normcase("A") == "a"
+
+
+def compile_name_pattern(pattern: str) -> Callable[[str], bool]:
+    """把 glob 模式预编译为文件名匹配函数，遍历时不再逐个条目解析模式。"""
+
+    if pattern == "*":
+        return lambda name: True
+    if not any(c in pattern for c in "*?["):
+        # 不含通配符时退化为文件名相等比较
+        if CASE_INSENSITIVE:
+            lowered = pattern.lower()
+            return lambda name: name.lower() == lowered
+        return pattern.__eq__
+    flags = re.IGNORECASE if CASE_INSENSITIVE else 0
+    regex = re.compile(fnmatch.translate(pattern), flags)
+    return lambda name: regex.match(name) is not None
+
+
+def iter_files(root: str, skip_dirs: FrozenSet[str] = SKIP_DIRS) -> Iterator[os.DirEntry]:
+    """基于 os.scandir 的显式栈遍历，只产出普通文件。
+
+    DirEntry 自带目录项类型，不需要为每个条目构造 Path 或额外 stat；
+    不跟随符号链接，避免绕出工作区或陷入环。skip_dirs 与隐藏目录在入栈前剪枝，
+    无法读取的目录直接跳过。
+    """
+
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    name = entry.name
+                    if name not in skip_dirs and not name.startswith("."):
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def is_binary_name(name: str) -> bool:
+    """按扩展名判断是否为二进制文件。"""
+
+    return name.rpartition(".")[2].lower() in BINARY_EXTS
+
+
+def looks_binary(data: Union[bytes, mmap.mmap]) -> bool:
+    """文件头含 NUL 字节时视为二进制；mmap 上直接查找，不复制文件头。"""
+
+    return data.find(b"\x00", 0, _BINARY_SNIFF_BYTES) >= 0